@@ -18,20 +18,36 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import shutil
 import threading
+import queue
 import time
 import json
 import os
 import re
-import pyautogui
-import pydirectinput
-import keyboard
 import ctypes
+import argparse
+import math
+from html.parser import HTMLParser
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
 import pytesseract
 import requests
 import random
 import sys
+import io
 import numpy as np
-from PIL import Image, ImageTk, ImageOps, ImageEnhance, ImageFilter
+import cv2
+from PIL import Image, ImageTk, ImageOps, ImageEnhance, ImageFilter, ImageDraw, ImageFont
+
+# Input/screen libraries need a Windows desktop; the simulator runs without them
+try:
+    import pyautogui
+    import pydirectinput
+    import keyboard
+except Exception:
+    pyautogui = pydirectinput = keyboard = None
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -53,6 +69,10 @@ except Exception:
 
 CONFIG_FILE = "scgm_config.json"
 POS_FILE = "scgm_positions.json"
+INCIDENT_DIR = "incidents"
+JOIN_SEQUENCE_FILE = "join_sequence.json"
+NAV_HISTORY_FILE = "nav_history.jsonl"
+TRAJECTORY_FILE = "trajectory.bin"
 
 # --- Tesseract OCR Configuration ---
 # Check bundled path first, then local folder
@@ -64,6 +84,2446 @@ if os.path.exists(bundled_tess_path):
 elif os.path.exists(local_tess_path):
     pytesseract.pytesseract.tesseract_cmd = local_tess_path
 
+def fit_velocity(samples):
+    """Fits distance = speed * (hold - latency) to (hold_seconds, distance) samples."""
+    samples = [(t, d) for t, d in samples if t > 0]
+    if not samples: return {"speed": 0.0, "latency": 0.0}
+    if len(samples) >= 2:
+        ts = np.array([t for t, _ in samples], dtype=float)
+        ds = np.array([d for _, d in samples], dtype=float)
+        if np.ptp(ts) > 0:
+            speed, offset = np.polyfit(ts, ds, 1)
+            if speed > 0:
+                latency = max(0.0, -offset / speed)
+                return {"speed": round(float(speed), 3), "latency": round(float(latency), 3)}
+    # Single sample (or unusable fit): assume movement starts instantly
+    t, d = max(samples)
+    return {"speed": round(d / t, 3), "latency": 0.0}
+
+def hold_time(distance, model, min_hold, max_hold):
+    """Key-hold duration needed to cover `distance` with a fitted velocity model."""
+    speed = model.get("speed", 0.0) if model else 0.0
+    if speed <= 0: return min_hold
+    return min(max(distance / speed + model.get("latency", 0.0), min_hold), max_hold)
+
+# --- Clocks ---
+class Clock:
+    """Real time. Everything that waits or timestamps takes a clock, so a VirtualClock can be
+    swapped in to run whole scenarios without actually waiting."""
+    def now(self):
+        return time.monotonic()
+
+    def wall(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0: time.sleep(seconds)
+
+class VirtualClock(Clock):
+    """Simulated time: sleep() returns immediately after moving the clock forward and calling
+    the `on_advance` listeners (e.g. GPOSimulator.advance) so a fake world keeps pace."""
+    def __init__(self, start=0.0, epoch=1_700_000_000.0):
+        self.t = float(start)
+        self.epoch = epoch
+        self.listeners = []
+
+    def now(self):
+        return self.t
+
+    def wall(self):
+        return self.epoch + self.t
+
+    def sleep(self, seconds):
+        if seconds <= 0: return
+        self.t += seconds
+        for fn in self.listeners: fn(seconds)
+
+    def on_advance(self, fn):
+        self.listeners.append(fn)
+
+REAL_CLOCK = Clock()
+
+# --- Input Injection Backends ---
+# Events are plain tuples so sequences can be built as lists and sent in one batch:
+#   ("key_down", key) ("key_up", key) ("press", key) ("write", text)
+#   ("click",) ("mouse_down",) ("mouse_up",) ("move_to", x, y) ("move_rel", dx, dy)
+#   ("wait", seconds)
+class InputBackend:
+    """Sends batches of input events with explicit timing and a per-event delay.
+
+    A batch containing any "wait" is timed explicitly: its events go out exactly as scheduled
+    (so key holds last as long as their waits say). `event_delay` only spaces out the events
+    of untimed batches, such as key combos and single-event helpers.
+    """
+    def __init__(self, event_delay=0.0, clock=None):
+        self.event_delay = event_delay
+        self.clock = clock or REAL_CLOCK
+
+    def send(self, events):
+        delay = 0.0 if any(e[0] == "wait" for e in events) else self.event_delay
+        for event in events:
+            if event[0] == "wait":
+                self.sleep(event[1])
+                continue
+            self.dispatch(event)
+            if delay > 0: self.sleep(delay)
+
+    def dispatch(self, event):
+        raise NotImplementedError
+
+    def sleep(self, seconds):
+        self.clock.sleep(seconds)
+
+    # Single-event helpers
+    def key_down(self, key): self.send([("key_down", key)])
+    def key_up(self, key): self.send([("key_up", key)])
+    def press(self, key): self.send([("press", key)])
+    def write(self, text): self.send([("write", text)])
+    def click(self): self.send([("click",)])
+    def mouse_down(self): self.send([("mouse_down",)])
+    def mouse_up(self): self.send([("mouse_up",)])
+    def move_to(self, x, y): self.send([("move_to", int(x), int(y))])
+    def move_rel(self, dx, dy): self.send([("move_rel", int(dx), int(dy))])
+
+class DirectInputBackend(InputBackend):
+    """Real input through pydirectinput (keys/mouse) and pyautogui (text)."""
+    def dispatch(self, event):
+        kind, args = event[0], event[1:]
+        # _pause=False: timing comes from event_delay and explicit waits, not the global PAUSE.
+        # press() and moveRel() call keyDown/keyUp and moveTo with the default pause inside, so
+        # they are spelled out here rather than called.
+        if kind == "key_down": pydirectinput.keyDown(*args, _pause=False)
+        elif kind == "key_up": pydirectinput.keyUp(*args, _pause=False)
+        elif kind == "press":
+            pydirectinput.keyDown(*args, _pause=False)
+            pydirectinput.keyUp(*args, _pause=False)
+        elif kind == "click": pydirectinput.click(_pause=False)
+        elif kind == "mouse_down": pydirectinput.mouseDown(_pause=False)
+        elif kind == "mouse_up": pydirectinput.mouseUp(_pause=False)
+        elif kind == "move_to": pydirectinput.moveTo(*args, _pause=False)
+        elif kind == "move_rel":
+            x, y = pydirectinput.position()
+            pydirectinput.moveTo(x + args[0], y + args[1], _pause=False)
+        elif kind == "write": pyautogui.write(*args, _pause=False)
+        else: raise ValueError(f"Unknown input event: {event}")
+
+class RecordingInputBackend(InputBackend):
+    """Fake backend for tests/benchmarks: records the event stream on a virtual timeline."""
+    def __init__(self, event_delay=0.0, clock=None):
+        super().__init__(event_delay, clock or VirtualClock())
+        self.events = []
+        self._t0 = self.clock.now()
+        self.send_calls = 0
+        self.send_seconds = 0.0
+
+    def send(self, events):
+        start = time.perf_counter()
+        super().send(events)
+        self.send_calls += 1
+        self.send_seconds += time.perf_counter() - start
+
+    @property
+    def virtual_time(self):
+        return self.clock.now() - self._t0
+
+    def dispatch(self, event):
+        self.events.append((round(self.virtual_time, 6), event))
+
+    def clear(self):
+        self.events.clear()
+        self._t0 = self.clock.now()
+        self.send_calls = 0
+        self.send_seconds = 0.0
+
+    def overhead(self):
+        """Average real time spent per injected event (excluding virtual waits)."""
+        n = len(self.events)
+        return {"events": n, "batches": self.send_calls,
+                "seconds_per_event": self.send_seconds / n if n else 0.0}
+
+def click_events(x, y, times=3, settle=1.0, gap=0.3):
+    """Move to (x, y), wiggle so the game registers the hover, then click `times` times."""
+    events = [("move_to", int(x), int(y)), ("wait", settle), ("move_rel", 2, 2), ("move_rel", -2, -2)]
+    for _ in range(times):
+        events += [("click",), ("wait", gap)]
+    return events
+
+# --- Join Sequence ---
+# Steps are plain dicts so the sequence can live in join_sequence.json:
+#   {"type": "click", "target": <position name> | "x"/"y", "times", "settle", "gap"}
+#   {"type": "type", "text": "{server_code}", "interval", "fast"}
+#   {"type": "key", "keys": ["ctrl", "a"], "action": "press"|"down"|"up", "repeat", "gap"}
+#   {"type": "wait", "seconds"}
+#   {"type": "wait_until", "condition": <name>, "timeout", "poll"}
+# Every step also takes "name", "timeout", "retries", "optional" and "set" (config updates
+# applied when the step succeeds).
+DEFAULT_JOIN_SEQUENCE = [
+    {"name": "open server menu", "type": "click", "target": "1. Server Menu Button"},
+    {"type": "wait", "seconds": 8},
+    {"name": "focus textbox", "type": "click", "target": "2. TextBox Input Area"},
+    {"type": "wait", "seconds": 8},
+    {"name": "clear textbox", "type": "click", "times": 1, "settle": 0, "gap": 0},
+    {"type": "key", "keys": ["ctrl", "a"]},
+    {"type": "key", "keys": ["backspace"]},
+    {"type": "wait", "seconds": 0.5},
+    {"name": "enter server code", "type": "type", "text": "{server_code}", "interval": 0.1},
+    {"type": "wait", "seconds": 1},
+    {"name": "submit code", "type": "key", "keys": ["enter"]},
+    {"type": "wait", "seconds": 8},
+    {"name": "fish hub", "type": "click", "target": "3. Fish Hub Button"},
+    {"name": "load map", "type": "wait_until", "condition": "coords_visible", "timeout": 45, "poll": 1,
+     "optional": True},
+    {"name": "running man", "type": "click", "target": "4. Running Man Button", "set": {"nav_move_mode": "run"}},
+    {"type": "wait", "seconds": 2},
+    {"name": "post-join keys", "type": "key", "keys": ["shift"], "action": "down"},
+    {"type": "wait", "seconds": 1},
+    {"type": "key", "keys": ["f3"]},
+    {"type": "wait", "seconds": 8},
+    {"type": "key", "keys": ["1"], "repeat": 4, "gap": 2},
+    {"type": "key", "keys": ["shift"], "action": "up"},
+]
+
+def load_join_sequence(path=JOIN_SEQUENCE_FILE):
+    """Loads the join steps from `path`, writing the default sequence there first if missing."""
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump(DEFAULT_JOIN_SEQUENCE, f, indent=4)
+        return [dict(step) for step in DEFAULT_JOIN_SEQUENCE]
+    with open(path, "r") as f:
+        steps = json.load(f)
+    if isinstance(steps, dict): steps = steps.get("steps", [])
+    for i, step in enumerate(steps):
+        if step.get("type") not in JoinSequence.STEP_TYPES:
+            raise ValueError(f"{path}: step {i + 1} has unknown type {step.get('type')!r}")
+        # Only a wait_until has anything to bound; input steps cannot be interrupted part-way
+        if "timeout" in step and step["type"] != "wait_until":
+            raise ValueError(f"{path}: step {i + 1} ({step['type']}) cannot have a timeout; "
+                             f"only wait_until steps wait on something")
+    return steps
+
+class JoinSequence:
+    """Runs declarative join steps through an InputBackend, timing and retrying each one.
+
+    `positions` maps click targets to {"x", "y"}, `variables` fills "{name}" placeholders in
+    typed text and `conditions` maps wait_until names to callables returning True when met.
+    """
+    STEP_TYPES = ("click", "type", "key", "wait", "wait_until")
+
+    def __init__(self, steps, input_backend, positions=None, variables=None, conditions=None,
+                 config=None, fast_type=False, log=print, clock=None):
+        self.steps = steps
+        self.input = input_backend
+        self.positions = positions or {}
+        self.variables = variables or {}
+        self.conditions = conditions or {}
+        self.config = config if config is not None else {}
+        self.fast_type = fast_type
+        self.log = log
+        self.clock = clock or REAL_CLOCK
+        self.sleep = self.clock.sleep
+        self.now = self.clock.now
+
+    def missing_positions(self):
+        """Click targets used by the steps that have no recorded position."""
+        return [s["target"] for s in self.steps if s["type"] == "click" and "target" in s
+                and s["target"] not in self.positions]
+
+    def run(self):
+        """Runs all steps; returns (ok, results) with one {name, ok, attempts, seconds} per step."""
+        results = []
+        for i, step in enumerate(self.steps):
+            name = step.get("name", f"{step['type']} #{i + 1}")
+            ok, error, attempts = False, None, 0
+            t0 = self.now()
+            for attempts in range(1, int(step.get("retries", 0)) + 2):
+                try:
+                    ok = self._run_step(step)
+                    error = None if ok else "condition not met"
+                except Exception as e:
+                    ok, error = False, str(e)
+                if ok: break
+                self.log(f"Join step '{name}' failed ({error}), attempt {attempts}.")
+            results.append({"name": name, "type": step["type"], "ok": ok, "attempts": attempts,
+                            "seconds": round(self.now() - t0, 3), "error": error})
+            if ok:
+                self.config.update(step.get("set", {}))
+            elif not step.get("optional"):
+                return False, results
+        return True, results
+
+    def _run_step(self, step):
+        kind = step["type"]
+        if kind == "click":
+            if "target" in step:
+                p = self.positions[step["target"]]
+                x, y = p["x"], p["y"]
+            else:
+                x, y = step.get("x"), step.get("y")
+            opts = {k: step[k] for k in ("times", "settle", "gap") if k in step}
+            if x is None:
+                events = [("click",), ("wait", opts.get("gap", 0.3))] * opts.get("times", 1)
+            else:
+                events = click_events(x, y, **opts)
+            self.input.send(events)
+        elif kind == "type":
+            text = step.get("text", "").format(**self.variables)
+            if step.get("fast", self.fast_type):
+                self.input.send([("write", text)])
+            else:
+                events = []
+                for char in text:
+                    events += [("write", char), ("wait", step.get("interval", 0.1))]
+                self.input.send(events)
+        elif kind == "key":
+            keys, action = step["keys"], step.get("action", "press")
+            if action == "down": combo = [("key_down", k) for k in keys]
+            elif action == "up": combo = [("key_up", k) for k in reversed(keys)]
+            else:
+                combo = [("key_down", k) for k in keys[:-1]] + [("press", keys[-1])] + \
+                        [("key_up", k) for k in reversed(keys[:-1])]
+            events = []
+            for _ in range(int(step.get("repeat", 1))):
+                events += combo + ([("wait", step["gap"])] if "gap" in step else [])
+            self.input.send(events)
+        elif kind == "wait":
+            self.sleep(step.get("seconds", 0))
+        elif kind == "wait_until":
+            condition = self.conditions[step["condition"]]
+            deadline = self.now() + step.get("timeout", 30)
+            while not condition():
+                if self.now() >= deadline: return False
+                self.sleep(step.get("poll", 0.5))
+        return True
+
+# --- Shared Screen Capture ---
+class FrameBus:
+    """Captures the screen once per tick into a reusable buffer shared by all consumers.
+
+    Consumers get zero-copy views into the buffer; they stay valid only until the next
+    capture, so anything kept across ticks (or handed to another thread) must be copied.
+    Only the worker thread captures into the buffer: everyone else uses snapshot().
+    """
+    def __init__(self, capture=None, clock=None):
+        self.capture = capture or pyautogui.screenshot
+        self.clock = clock or REAL_CLOCK
+        self.captures = 0
+        self._buf = None
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    def grab(self):
+        """Forces a fresh capture and returns the whole frame (H x W x 3, RGB)."""
+        with self._lock:
+            img = self.capture()
+            arr = img if isinstance(img, np.ndarray) else np.asarray(img.convert("RGB"))
+            if self._buf is None or self._buf.shape != arr.shape:
+                self._buf = np.empty(arr.shape, dtype=np.uint8)
+            np.copyto(self._buf, arr)
+            self._stamp = self.clock.now()
+            self.captures += 1
+            return self._buf
+
+    def age(self):
+        """Seconds since the last capture (inf if nothing was captured yet)."""
+        return float("inf") if self._stamp is None else self.clock.now() - self._stamp
+
+    def frame(self, max_age=0.0):
+        """Returns the current frame, capturing a new one if it is older than `max_age`."""
+        with self._lock:
+            if self._buf is None or self.age() > max_age:
+                return self.grab()
+            return self._buf
+
+    def view(self, region, max_age=0.0):
+        """Zero-copy view of a (left, top, width, height) region of the current frame."""
+        return self._crop(self.frame(max_age), region)
+
+    def snapshot(self, region=None, max_age=0.0):
+        """Private copy of the frame (or a region of it) for callers off the worker thread.
+
+        The copy is taken under the lock; a stale frame is replaced by a capture into a separate
+        array, so the worker's views are never overwritten underneath it.
+        """
+        with self._lock:
+            if self._buf is not None and self.age() <= max_age:
+                frame = self._buf
+            else:
+                img = self.capture()
+                frame = img if isinstance(img, np.ndarray) else np.asarray(img.convert("RGB"))
+            return (frame if region is None else self._crop(frame, region)).copy()
+
+    @staticmethod
+    def _crop(frame, region):
+        left, top, w, h = (int(v) for v in region)
+        # Whatever lies left of / above the screen is cut off, not shifted in
+        w, h = max(w + min(left, 0), 0), max(h + min(top, 0), 0)
+        left, top = max(left, 0), max(top, 0)
+        return frame[top:top + h, left:left + w]
+
+def locate_template(haystack, needle, confidence):
+    """Finds `needle` inside `haystack` (RGB arrays); returns (left, top, width, height) or None."""
+    nh, nw = needle.shape[:2]
+    if haystack.shape[0] < nh or haystack.shape[1] < nw: return None
+    result = cv2.matchTemplate(haystack, needle, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if max_val < confidence: return None
+    return (max_loc[0], max_loc[1], nw, nh)
+
+# --- Metrics & Control Endpoint ---
+class Metrics:
+    """Thread-safe counters, gauges and summaries rendered in Prometheus text format.
+
+    Updates are a dict write under a lock, cheap enough for the hot loops.
+    """
+    def __init__(self, prefix="gpo_"):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.summaries = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, fn):
+        """Registers fn() -> {gauge_name: value}, evaluated only when metrics are scraped."""
+        self.collectors.append(fn)
+
+    @staticmethod
+    def series(name, **labels):
+        """Series name with labels, e.g. series("nav_ticks_total", status="move"); values are escaped."""
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return name + "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, value):
+        """Adds a sample to a count/sum/max summary (e.g. latencies in seconds)."""
+        with self._lock:
+            s = self.summaries.setdefault(name, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += value
+            s[2] = max(s[2], value)
+
+    def render(self):
+        with self._lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            summaries = {k: list(v) for k, v in self.summaries.items()}
+        for fn in self.collectors:
+            try:
+                gauges.update(fn())
+            except Exception:
+                pass
+        lines, typed = [], set()
+
+        def add(name, kind, value):
+            # Labelled series share one TYPE line for their base name
+            base = name.split("{")[0]
+            if base not in typed:
+                typed.add(base)
+                lines.append(f"# TYPE {self.prefix}{base} {kind}")
+            lines.append(f"{self.prefix}{name} {value}")
+
+        for name, value in sorted(counters.items()):
+            add(name, "counter", value)
+        for name, value in sorted(gauges.items()):
+            add(name, "gauge", float(value))
+        for name, (count, total, peak) in sorted(summaries.items()):
+            lines += [f"# TYPE {self.prefix}{name} summary", f"{self.prefix}{name}_count {count}",
+                      f"{self.prefix}{name}_sum {total}"]
+            # A summary only has _count/_sum (and quantiles), so the peak is its own gauge
+            add(f"{name}_max", "gauge", peak)
+        return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Optional local HTTP server: GET /metrics, GET /status and POST /control/<name>.
+
+    `controls` maps a name to (get_state, set_state); a POST body must be {"enabled": true/false},
+    or empty to toggle the current state. Anything else is answered with 400.
+    """
+    def __init__(self, metrics, controls=None, host="127.0.0.1", port=0):
+        self.metrics = metrics
+        self.controls = controls or {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, body, content_type="application/json"):
+                data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path == "/metrics":
+                    self._reply(200, server.metrics.render(), "text/plain; version=0.0.4")
+                elif path == "/status":
+                    self._reply(200, {name: bool(get()) for name, (get, _) in server.controls.items()})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                name = path[len("/control/"):] if path.startswith("/control/") else None
+                if name not in server.controls:
+                    self._reply(404, {"error": "unknown control"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    raw = self.rfile.read(length).strip() if length > 0 else b""
+                    body = json.loads(raw) if raw else None
+                except Exception:
+                    self._reply(400, {"error": "invalid JSON"})
+                    return
+                get, put = server.controls[name]
+                if body is None:
+                    enabled = not get()
+                elif isinstance(body, dict) and isinstance(body.get("enabled"), bool):
+                    enabled = body["enabled"]
+                else:
+                    self._reply(400, {"error": 'body must be {"enabled": true|false} or empty'})
+                    return
+                put(enabled)
+                self._reply(200, {name: enabled})
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# --- Trajectory Store ---
+TRAJ_DTYPE = np.dtype([("t", "<f8"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+                       ("keys", "u1"), ("state", "u1"), ("run", "<u4")])
+TRAJ_KEY_BITS = {"w": 1, "a": 2, "s": 4, "d": 8, "space": 16}
+RECOVERY_STRATEGIES = ("jump", "sidestep", "back_off", "replan")
+TRAJ_STATES = ["move", "no_read", "unstable", "anti_drown", "nudge", "reached", "stuck"] + \
+              ["recover_" + s for s in RECOVERY_STRATEGIES]
+
+class TrajectoryStore:
+    """Append-only position log in a memory-mapped fixed-record file, with a spatial grid index.
+
+    File layout: 64-byte header (magic, record count) followed by TRAJ_DTYPE records.
+    The grid maps (x, z) cells to record indices so spatial queries only touch nearby samples:
+    records present on open are sorted by cell code (found with searchsorted), samples
+    appended since then go to per-cell lists.
+    """
+    MAGIC = b"GPOTRAJ1"
+    HEADER = 64
+
+    def __init__(self, path=TRAJECTORY_FILE, cell=8.0, initial_capacity=65536):
+        self.path = path
+        self.cell = float(cell)
+        self._lock = threading.Lock()
+        if not os.path.exists(path) or os.path.getsize(path) < self.HEADER:
+            with open(path, "wb") as f:
+                f.write(self.MAGIC.ljust(self.HEADER, b"\0"))
+                f.truncate(self.HEADER + initial_capacity * TRAJ_DTYPE.itemsize)
+        with open(path, "rb") as f:
+            if f.read(8) != self.MAGIC: raise ValueError(f"{path} is not a trajectory file")
+        self._open()
+        self.count = int(self._header[1])
+        self._build_index()
+
+    def _open(self):
+        capacity = (os.path.getsize(self.path) - self.HEADER) // TRAJ_DTYPE.itemsize
+        self._header = np.memmap(self.path, dtype="<u8", mode="r+", offset=0, shape=(self.HEADER // 8,))
+        self.records = np.memmap(self.path, dtype=TRAJ_DTYPE, mode="r+", offset=self.HEADER, shape=(capacity,))
+
+    def _close(self):
+        """Flushes and drops every mapping of the file (Windows refuses to resize a mapped file)."""
+        self.records.flush()
+        self._header.flush()
+        del self.records, self._header
+
+    def _grow(self):
+        new_capacity = max(1024, len(self.records) * 2)
+        self._close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.HEADER + new_capacity * TRAJ_DTYPE.itemsize)
+        self._open()
+
+    def _cell_of(self, x, z):
+        return (int(np.floor(x / self.cell)), int(np.floor(z / self.cell)))
+
+    @staticmethod
+    def _cell_code(cx, cz):
+        return (cx + (1 << 30)) * (1 << 31) + (cz + (1 << 30))
+
+    def _build_index(self):
+        """Sorts existing records by grid cell (vectorised, runs once on open)."""
+        self.pending = {}
+        self.run_start = {}
+        rec = self.records[:self.count]
+        codes = self._cell_code(np.floor(rec["x"] / self.cell).astype(np.int64),
+                                np.floor(rec["z"] / self.cell).astype(np.int64))
+        self._order = np.argsort(codes, kind="stable")
+        self._codes = codes[self._order]
+        runs, first = np.unique(rec["run"], return_index=True)
+        self.run_start = {int(r): int(i) for r, i in zip(runs, first)}
+
+    def next_run(self):
+        """Id for a new navigation run (one more than the last recorded)."""
+        return (max(self.run_start) + 1) if self.run_start else 1
+
+    def append(self, t, x, y, z, keys=(), state="move", run=0):
+        mask = 0
+        for k in keys: mask |= TRAJ_KEY_BITS.get(k, 0)
+        with self._lock:
+            if self.count >= len(self.records): self._grow()
+            i = self.count
+            self.records[i] = (t, x, y, z, mask, TRAJ_STATES.index(state) if state in TRAJ_STATES else 0, run)
+            self.count += 1
+            self._header[1] = self.count
+            self.pending.setdefault(self._cell_of(x, z), []).append(i)
+            self.run_start.setdefault(int(run), i)
+        return i
+
+    def flush(self):
+        with self._lock:
+            self.records.flush()
+            self._header.flush()
+
+    def near(self, x, z, radius, state=None):
+        """Indices of samples within `radius` of (x, z), optionally only in one state."""
+        c0x, c0z = self._cell_of(x - radius, z - radius)
+        c1x, c1z = self._cell_of(x + radius, z + radius)
+        cells = [(i, j) for i in range(c0x, c1x + 1) for j in range(c0z, c1z + 1)]
+        codes = np.array([self._cell_code(i, j) for i, j in cells], dtype=np.int64)
+        lo = np.searchsorted(self._codes, codes, "left")
+        hi = np.searchsorted(self._codes, codes, "right")
+        chunks = [self._order[a:b] for a, b in zip(lo, hi) if b > a]
+        with self._lock:
+            chunks += [np.array(self.pending[c], dtype=np.intp) for c in cells if c in self.pending]
+        if not chunks: return np.empty(0, dtype=np.intp)
+        idx = np.concatenate(chunks)
+        rec = self.take(idx)
+        keep = (rec["x"] - x)**2 + (rec["z"] - z)**2 <= radius**2
+        if state is not None: keep &= rec["state"] == TRAJ_STATES.index(state)
+        return idx[keep]
+
+    def take(self, idx):
+        """Copy of the records at `idx`; never a view, so the file can still be grown."""
+        with self._lock:
+            return self.records[idx].copy()
+
+    def stuck_near(self, x, z, radius=5.0):
+        """Records (structured array) of places we got stuck close to (x, z)."""
+        return self.take(self.near(x, z, radius, state="stuck"))
+
+    def fastest_approach(self, x, z, radius=2.0):
+        """Quickest recorded run that reached within `radius` of (x, z), or None."""
+        idx = self.near(x, z, radius)
+        if not len(idx): return None
+        rec = self.take(idx)
+        best = None
+        for run in np.unique(rec["run"]):
+            start = self.take(self.run_start[int(run)])
+            seconds = float(rec["t"][rec["run"] == run].min()) - float(start["t"])
+            if best is None or seconds < best["seconds"]:
+                best = {"run": int(run), "seconds": round(seconds, 3),
+                        "start": (float(start["x"]), float(start["z"]))}
+        return best
+
+    def best_recovery(self, x, z, radius=4.0):
+        """Recovery strategy that most often got us unstuck near (x, z), or None."""
+        states = self.take(self.near(x, z, radius))["state"]
+        counts = [(np.count_nonzero(states == TRAJ_STATES.index("recover_" + s)), s) for s in RECOVERY_STRATEGIES]
+        n, best = max(counts)
+        return best if n else None
+
+# --- Hotkeys ---
+MODIFIER_KEYS = ("ctrl", "shift", "alt")
+
+class HotkeyListener:
+    """One keyboard hook that dispatches debounced, rebindable actions onto worker queues.
+
+    Each queue has a single worker thread, so a slow action (the join sequence) only
+    blocks later actions on its own queue, never the hook or the monitoring loop.
+    """
+    def __init__(self, log=print, debounce=0.3, clock=None):
+        self.log = log
+        self.debounce = debounce
+        self.clock = clock or REAL_CLOCK
+        self.actions = {}
+        self.bindings = {}
+        self._one_shots = {}
+        self._queues = {}
+        self._busy = set()
+        self._last = {}
+        self._lock = threading.Lock()
+        self._hook = None
+
+    def register(self, action, binding, callback, queue_name="default", coalesce=False):
+        """Binds `binding` (e.g. "f8", "ctrl+f9") to `callback`; coalesced actions are
+        dropped while a previous run is still queued or running."""
+        self.actions[action] = (callback, queue_name, coalesce)
+        self.rebind(action, binding)
+
+    def rebind(self, action, binding):
+        with self._lock:
+            self.bindings = {k: a for k, a in self.bindings.items() if a != action}
+            binding = (binding or "").strip().lower()
+            if binding:
+                self.bindings[binding] = action
+
+    def binding_for(self, action):
+        return next((k for k, a in self.bindings.items() if a == action), "")
+
+    def once(self, binding, callback, queue_name="setup"):
+        """Runs `callback` the next time `binding` is pressed (e.g. setup position capture)."""
+        with self._lock:
+            self._one_shots[binding.strip().lower()] = (callback, queue_name)
+
+    def trigger(self, action):
+        """Dispatches an action exactly as if its hotkey had been pressed."""
+        callback, queue_name, coalesce = self.actions[action]
+        self._dispatch(action, callback, queue_name, coalesce)
+
+    def start(self):
+        if keyboard is None or self._hook is not None: return self
+        self._hook = keyboard.hook(self._on_event)
+        return self
+
+    def stop(self):
+        if self._hook is not None:
+            keyboard.unhook(self._hook)
+            self._hook = None
+
+    def _pressed_binding(self, name):
+        mods = [m for m in MODIFIER_KEYS if m != name and keyboard.is_pressed(m)]
+        return "+".join(mods + [name])
+
+    def _on_event(self, event):
+        # Runs on the keyboard hook thread: only look things up and enqueue
+        if event.event_type != "down" or not event.name: return
+        binding = self._pressed_binding(event.name.lower())
+        with self._lock:
+            one_shot = self._one_shots.pop(binding, None)
+            action = self.bindings.get(binding)
+        if action not in self.actions: action = None
+        if one_shot:
+            self._queue(one_shot[1]).put((None, one_shot[0]))
+            return
+        if action:
+            now = self.clock.now()
+            if now - self._last.get(action, float("-inf")) < self.debounce: return
+            self._last[action] = now
+            callback, queue_name, coalesce = self.actions[action]
+            self._dispatch(action, callback, queue_name, coalesce)
+
+    def _dispatch(self, action, callback, queue_name, coalesce):
+        with self._lock:
+            if coalesce and action in self._busy: return
+            self._busy.add(action)
+        self._queue(queue_name).put((action, callback))
+
+    def _queue(self, name):
+        with self._lock:
+            if name not in self._queues:
+                q = queue.Queue()
+                self._queues[name] = q
+                threading.Thread(target=self._worker, args=(q,), daemon=True).start()
+            return self._queues[name]
+
+    def _worker(self, q):
+        while True:
+            action, callback = q.get()
+            try:
+                callback()
+            except Exception as e:
+                self.log(f"Hotkey Action Error ({action or 'capture'}): {e}")
+            finally:
+                with self._lock:
+                    self._busy.discard(action)
+
+# --- Flight Recorder ---
+class FlightRecorder:
+    """Bounded in-memory ring buffer of recent frames, OCR crops, coordinates and decisions.
+
+    Everything lives in preallocated NumPy arrays sized from a memory cap, so recording
+    never allocates or touches the disk; `dump()` writes a compressed archive on incident and
+    keeps only the newest `max_incidents` archives in the folder.
+    """
+    FRAME_SHAPE = (90, 160)
+    CROP_SHAPE = (32, 128)
+    MAX_DECISIONS = 1024
+
+    def __init__(self, seconds=60, max_mb=32, rate=10, max_incidents=20, clock=None):
+        self.clock = clock or REAL_CLOCK
+        self.max_incidents = max_incidents
+        slot_bytes = int(np.prod(self.FRAME_SHAPE) + np.prod(self.CROP_SHAPE)) + 3 * 4 + 8 + 2 + 2
+        self.seconds = seconds
+        self.size = max(1, min(int(seconds * rate), int(max_mb * 1024 * 1024) // slot_bytes))
+        self.t = np.full(self.size, np.nan, dtype=np.float64)
+        self.frames = np.zeros((self.size,) + self.FRAME_SHAPE, dtype=np.uint8)
+        self.crops = np.zeros((self.size,) + self.CROP_SHAPE, dtype=np.uint8)
+        self.has_frame = np.zeros(self.size, dtype=bool)
+        self.has_crop = np.zeros(self.size, dtype=bool)
+        self.coords = np.full((self.size, 3), np.nan, dtype=np.float32)
+        self.decisions = np.zeros(self.size, dtype=np.int16)
+        self.vocab = [""]
+        self._vocab_index = {"": 0}
+        self._shrink_index = {}
+        self.head = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _shrink(self, img, shape):
+        """Nearest-neighbour downscale to a grayscale `shape` using cached index arrays."""
+        key = (img.shape[:2], shape)
+        if key not in self._shrink_index:
+            rows = np.linspace(0, img.shape[0] - 1, shape[0]).astype(np.intp)
+            cols = np.linspace(0, img.shape[1] - 1, shape[1]).astype(np.intp)
+            self._shrink_index[key] = np.ix_(rows, cols)
+        small = img[self._shrink_index[key]]
+        if small.ndim == 3:
+            small = small[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        return small
+
+    def _decision_code(self, decision):
+        code = self._vocab_index.get(decision)
+        if code is None:
+            if len(self.vocab) >= self.MAX_DECISIONS: decision = "other"
+            code = self._vocab_index.setdefault(decision, len(self.vocab))
+            if code == len(self.vocab): self.vocab.append(decision)
+        return code
+
+    def record(self, frame=None, crop=None, coords=None, decision=None):
+        """Stores one sample; any field may be omitted."""
+        with self._lock:
+            i = self.head
+            self.t[i] = self.clock.wall()
+            self.has_frame[i] = frame is not None and frame.size > 0
+            if self.has_frame[i]: self.frames[i] = self._shrink(frame, self.FRAME_SHAPE)
+            self.has_crop[i] = crop is not None and crop.size > 0
+            if self.has_crop[i]: self.crops[i] = self._shrink(crop, self.CROP_SHAPE)
+            self.coords[i] = coords if coords is not None else np.nan
+            self.decisions[i] = self._decision_code(decision or "")
+            self.head = (i + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+
+    def snapshot(self, seconds=None):
+        """Copies the recorded samples (oldest first) from the last `seconds`."""
+        with self._lock:
+            order = (np.arange(self.count) + self.head - self.count) % self.size
+            keep = order[self.t[order] >= self.clock.wall() - (seconds or self.seconds)]
+            return {
+                "t": self.t[keep], "frames": self.frames[keep], "has_frame": self.has_frame[keep],
+                "crops": self.crops[keep], "has_crop": self.has_crop[keep],
+                "coords": self.coords[keep], "decisions": self.decisions[keep],
+                "vocab": np.array(self.vocab),
+            }
+
+    def dump(self, reason, seconds=None, folder=INCIDENT_DIR):
+        """Writes the recent history to a compressed .npz in the background; returns its path."""
+        data = self.snapshot(seconds)
+        os.makedirs(folder, exist_ok=True)
+        safe_reason = re.sub(r'[^a-z0-9_]+', '_', reason.lower())
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.clock.wall()))
+        path = os.path.join(folder, f"incident_{stamp}_{safe_reason}.npz")
+
+        def _write():
+            try:
+                np.savez_compressed(path, reason=np.array(reason), **data)
+                self.prune(folder)
+            except Exception as e:
+                print(f"Flight Recorder Error: {e}")
+        threading.Thread(target=_write, daemon=True).start()
+        return path
+
+    def prune(self, folder=INCIDENT_DIR):
+        """Deletes all but the newest `max_incidents` archives (names sort by their timestamp)."""
+        archives = sorted(f for f in os.listdir(folder) if f.startswith("incident_") and f.endswith(".npz"))
+        for name in archives[:max(0, len(archives) - self.max_incidents)]:
+            os.remove(os.path.join(folder, name))
+
+# --- Coordinate OCR ---
+OCR_TESS_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.xyz:- '
+
+# Relative per-pixel cost of each resampling filter, used to rank upscale settings
+OCR_FILTER_COST = {"NEAREST": 1.0, "BILINEAR": 1.5, "BICUBIC": 2.0, "LANCZOS": 3.0}
+OCR_SCALE_FACTORS = (1, 2, 3, 4)
+# Distinct coordinate readings needed before a cheaper upscale setting can be trusted
+OCR_SCALE_MIN_LABELS = 3
+
+# Preprocessing variants read in parallel by ocr_coords_ensemble; a reading is only accepted
+# when enough of them agree (each variant fails differently on glare, outlines and water)
+OCR_ENSEMBLE = (
+    {"threshold": 160},
+    {"threshold": 120},
+    {"threshold": 200},
+    {"adaptive": True},
+    {"invert": False, "threshold": None},
+)
+OCR_POOL = ThreadPoolExecutor(max_workers=len(OCR_ENSEMBLE), thread_name_prefix="ocr")
+
+def preprocess_coords_image(img, factor=4, resample="LANCZOS", invert=True, threshold=160, adaptive=False):
+    """Upscales, inverts and thresholds the HUD crop so Tesseract sees black text on white."""
+    # Enhancement: Upscale (4x LANCZOS unless setup found a cheaper setting that reads as well)
+    if factor != 1:
+        w, h = img.size
+        img = img.resize((w*factor, h*factor), getattr(Image.Resampling, resample))
+    
+    # Enhancement: Invert (Black text on White)
+    img = img.convert('L')
+    if invert: img = ImageOps.invert(img)
+    
+    # Enhancement: High Contrast
+    enhancer = ImageEnhance.Contrast(img)
+    img = enhancer.enhance(3.0)
+    if adaptive:
+        # Local threshold (block about one text height) copes with uneven backgrounds
+        block = max(3, (img.size[1] // 2) | 1)
+        return Image.fromarray(cv2.adaptiveThreshold(np.asarray(img), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                     cv2.THRESH_BINARY, block, 10))
+    if threshold is None: return img
+    return img.point(lambda p: 255 if p > threshold else 0)
+
+def parse_coords_text(text):
+    """Extracts the first three coordinate numbers from raw OCR text, or None."""
+    # Cleanup x, y, z labels
+    text = re.sub(r'[xyz%:]', ' ', text.lower())
+    
+    # Fix misread minus signs (sometimes read as ' ' or '.' depending on font)
+    # In Tesseract, we search for numbers. If navigation is messed up, 
+    # we'll tweak this regex further.
+    num_pattern = r'([-.]?\s*\d+\.\d+|[-.]?\s*\d+)'
+    raw_nums = re.findall(num_pattern, text)
+    
+    nums = []
+    for n in raw_nums:
+        try:
+            clean_n = n.replace(" ", "")
+            # Small GPO fix: lone '.' usually means '-' for the Z coord
+            if clean_n.startswith('.'): clean_n = '-' + clean_n[1:]
+            
+            if clean_n and clean_n != "-":
+                val = float(clean_n)
+                # Filter single digit labels
+                if abs(val) < 10 and "." not in clean_n: continue
+                nums.append(val)
+        except: continue
+
+    return (nums[0], nums[1], nums[2]) if len(nums) >= 3 else None
+
+def ocr_coords(img, debug_path=None, factor=4, resample="LANCZOS"):
+    """Runs the full OCR path on a HUD crop; returns ((x, y, z) or None, raw_text)."""
+    img = preprocess_coords_image(img, factor, resample)
+    if debug_path:
+        img.save(debug_path)
+    
+    # Tesseract OCR (PSM 7 is best for single lines/fragments)
+    text = pytesseract.image_to_string(img, config=OCR_TESS_CONFIG).lower()
+    return parse_coords_text(text), text
+
+def _upscaled_copy(img, factor, resample, debug_path=None, debug_variant=None):
+    # Upscale once for all variants; this also copies the crop, so the workers never touch a FrameBus view
+    if factor != 1:
+        w, h = img.size
+        img = img.resize((w*factor, h*factor), getattr(Image.Resampling, resample))
+    else:
+        img = img.copy()
+    if debug_path:
+        preprocess_coords_image(img, factor=1, **(debug_variant or {})).save(debug_path)
+    return img
+
+def _ocr_variant(img, variant):
+    text = pytesseract.image_to_string(preprocess_coords_image(img, factor=1, **variant), config=OCR_TESS_CONFIG)
+    return parse_coords_text(text.lower()), text.lower()
+
+def ocr_coords_ensemble(img, debug_path=None, factor=4, resample="LANCZOS", variants=OCR_ENSEMBLE, min_agree=2):
+    """Reads a HUD crop once per preprocessing variant on OCR_POOL.
+
+    Returns ((x, y, z) or None, raw_texts). Coords are returned only if at least `min_agree`
+    variants parsed exactly the same triple.
+    """
+    img = _upscaled_copy(img, factor, resample, debug_path, variants[0])
+    results = list(OCR_POOL.map(lambda v: _ocr_variant(img, v), variants))
+    text = " | ".join(t.strip() for _, t in results)
+    votes = Counter(c for c, _ in results if c)
+    if not votes: return None, text
+    coords, n = votes.most_common(1)[0]
+    return (coords if n >= min_agree else None), text
+
+# --- Confidence-Aware Decoding ---
+OCR_HOCR_CONFIG = OCR_TESS_CONFIG + " -c hocr_char_boxes=1"
+
+class _HocrChars(HTMLParser):
+    """Collects (char, confidence 0-1) from hOCR; falls back to the word confidence when the
+    Tesseract build does not emit per-character ocrx_cinfo spans."""
+    def __init__(self):
+        super().__init__()
+        self.chars = []
+        self._spans = []
+        self._word = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "span": return
+        attrs = dict(attrs)
+        cls, title = attrs.get("class", ""), attrs.get("title", "")
+        conf = re.search(r"x_w?conf ([\d.]+)", title)
+        conf = float(conf.group(1)) / 100 if conf else 1.0
+        if cls == "ocrx_word":
+            if self.chars: self.chars.append((" ", 1.0))
+            self._word = {"conf": conf, "text": [], "cinfo": False}
+        elif cls == "ocrx_cinfo" and self._word is not None:
+            self._word["cinfo"] = True
+        self._spans.append((cls, conf))
+
+    def handle_data(self, data):
+        if not self._spans or self._word is None: return
+        cls, conf = self._spans[-1]
+        if cls == "ocrx_cinfo": self.chars += [(c, conf) for c in data]
+        else: self._word["text"].append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "span" or not self._spans: return
+        cls, _ = self._spans.pop()
+        if cls == "ocrx_word" and self._word is not None:
+            if not self._word["cinfo"]:
+                self.chars += [(c, self._word["conf"]) for c in "".join(self._word["text"]).strip()]
+            self._word = None
+
+def parse_hocr_chars(hocr):
+    """(char, confidence 0-1) pairs from Tesseract hOCR output; words are separated by (" ", 1.0)."""
+    parser = _HocrChars()
+    parser.feed(hocr.decode("utf-8", "replace") if isinstance(hocr, bytes) else hocr)
+    return parser.chars
+
+def _ocr_variant_chars(img, variant):
+    hocr = pytesseract.image_to_pdf_or_hocr(preprocess_coords_image(img, factor=1, **variant),
+                                           extension="hocr", config=OCR_HOCR_CONFIG)
+    return parse_hocr_chars(hocr)
+
+def ocr_readings(img, debug_path=None, factor=4, resample="LANCZOS", variants=OCR_ENSEMBLE):
+    """Per-character readings (lists of (char, confidence)) of a HUD crop, one per variant, on OCR_POOL."""
+    img = _upscaled_copy(img, factor, resample, debug_path, variants[0])
+    return list(OCR_POOL.map(lambda v: _ocr_variant_chars(img, v), variants))
+
+# Prior odds of the usual Tesseract slips on this HUD font
+OCR_P_MISSED_MINUS = 0.05
+OCR_P_MISSED_DOT = 0.1
+
+def _number_alternatives(chars):
+    """Possible values of one numeric token [(char, conf)] with their log-likelihoods."""
+    sign = None
+    if chars[0][0] in "-.":
+        sign, chars = chars[0][1], chars[1:]
+    digits = [(c, p) for c, p in chars if c.isdigit()]
+    dots = [p for c, p in chars if c == "."]
+    if not digits: return []
+    logp = sum(math.log(max(p, 1e-3)) for _, p in digits)
+    text = "".join(c for c, _ in digits)
+    point = next((i for i, (c, _) in enumerate(chars) if c == "."), None)
+    if point is not None:
+        before = sum(1 for c, _ in chars[:point] if c.isdigit())
+        forms = [(float(text[:before] + "." + text[before:]) if before < len(text) else float(text), math.log(max(dots[0], 1e-3))),
+                 (float(text), math.log(max(1 - dots[0], 1e-3)))]
+    else:
+        if len(text) < 2: return []  # single digit without a point: an axis label, not a value
+        forms = [(float(text), math.log(1 - OCR_P_MISSED_DOT)),
+                 (float(text[:-1] + "." + text[-1]), math.log(OCR_P_MISSED_DOT))]
+    # A leading '-' (or a '.', the usual misread of it) makes the value negative unless it was noise
+    p_neg = max(min(sign, 1 - 1e-3), 1e-3) if sign is not None else OCR_P_MISSED_MINUS
+    out = []
+    for value, lp in forms:
+        out.append((value, logp + lp + math.log(1 - p_neg)))
+        out.append((-value, logp + lp + math.log(p_neg)))
+    return out
+
+def coord_candidates(chars, max_tokens=6):
+    """All (x, y, z) parses of one reading with their OCR log-likelihoods, best first.
+
+    Covers the ambiguities that trip the plain parser: a lost or spurious minus sign, a lost
+    or spurious decimal point, and stray numeric tokens between the three values.
+    """
+    clean = [(" " if c.lower() in "xyz%:" else c, p) for c, p in chars]
+    text = "".join(c for c, _ in clean)
+    tokens = []
+    for m in re.finditer(r'[-.]?\s*\d+(?:\.\d+)?', text):
+        token = [clean[i] for i in range(m.start(), m.end()) if clean[i][0] != " "]
+        alts = _number_alternatives(token)
+        if alts: tokens.append((alts, sum(p for _, p in token) / len(token)))
+    tokens = tokens[:max_tokens]
+    best = {}
+    n = len(tokens)
+    for i in range(n):
+        for j in range(i + 1, n):
+            for k in range(j + 1, n):
+                # Skipping a token we were confident about is unlikely
+                skip = sum(math.log(max(1 - conf, 1e-3)) for t, (_, conf) in enumerate(tokens) if t not in (i, j, k))
+                for x, lx in tokens[i][0]:
+                    for y, ly in tokens[j][0]:
+                        for z, lz in tokens[k][0]:
+                            lp = lx + ly + lz + skip
+                            if lp > best.get((x, y, z), -math.inf): best[(x, y, z)] = lp
+    return sorted(best.items(), key=lambda kv: -kv[1])
+
+class CoordDecoder:
+    """Picks the most probable (x, y, z) from per-character OCR readings plus the previous frame.
+
+    Each candidate's OCR likelihood is averaged over the readings (ensemble variants that agree
+    reinforce each other). It is then combined with a Gaussian motion prior around the last
+    decoded position. The prior's width grows with `max_speed` times the time since that frame,
+    and a small outlier floor keeps genuine teleports (respawns) reachable. An outlier is only
+    accepted once the next frame decodes to the same place. The winner must also be a possible
+    parse of at least `min_support` readings (the decoder's form of ensemble consensus).
+    """
+    def __init__(self, max_speed=30.0, base_sigma=0.5, memory=5.0, outlier=1e-3, min_likelihood=1e-4):
+        self.max_speed = max_speed
+        self.base_sigma = base_sigma
+        self.memory = memory
+        self.outlier = outlier
+        self.min_likelihood = min_likelihood
+        self.prev = None
+        self.prev_t = None
+        self.pending = None
+
+    def reset(self):
+        self.prev = self.prev_t = self.pending = None
+
+    def log_prior(self, coords, now):
+        if self.prev is None or now - self.prev_t > self.memory: return 0.0
+        sigma = self.base_sigma + self.max_speed * max(0.0, now - self.prev_t)
+        d2 = sum(((a - b) / sigma)**2 for a, b in zip(coords, self.prev))
+        return float(np.logaddexp(math.log(1 - self.outlier) - 0.5 * d2, math.log(self.outlier)))
+
+    def decode(self, readings, now, min_support=1):
+        """Returns ((x, y, z) or None, details) and remembers accepted values as the next prior."""
+        likelihood, support = {}, Counter()
+        for chars in readings:
+            for coords, lp in coord_candidates(chars):
+                likelihood[coords] = likelihood.get(coords, 0.0) + math.exp(lp) / len(readings)
+                support[coords] += 1
+        if not likelihood: return None, {"candidates": 0}
+        scored = sorted(((math.log(p) + self.log_prior(c, now), c, p) for c, p in likelihood.items()), reverse=True)
+        score, coords, p = scored[0]
+        details = {"candidates": len(scored), "likelihood": round(p, 4), "score": round(score, 3),
+                   "support": support[coords], "runner_up": scored[1][1] if len(scored) > 1 else None}
+        if p < self.min_likelihood or support[coords] < min(min_support, len(readings)): return None, details
+        if self.prev is not None and score - math.log(p) <= math.log(self.outlier) + 1e-6:
+            pending, self.pending = self.pending, coords
+            near = pending is not None and all(abs(a - b) <= 4 * self.base_sigma for a, b in zip(pending, coords))
+            if not near:
+                details["outlier"] = True
+                return None, details
+        self.prev, self.prev_t, self.pending = coords, now, None
+        return coords, details
+
+OCRSettings = namedtuple("OCRSettings", [
+    "region", "factor", "filter", "scale_stale", "ensemble", "consensus", "decoder"])
+
+def compile_ocr_settings(config):
+    """Resolves the OCR region, validated upscale and reading mode from `config` into an immutable
+    OCRSettings; like compile_nav_settings, rebuild it when the config changes."""
+    region = list(config.get("ocr_region") or [])
+    choice = config.get("ocr_scale") or {}
+    stale = bool(choice) and list(choice.get("region") or []) != region
+    factor, resample = ((int(choice.get("factor", 4)), choice.get("filter", "LANCZOS"))
+                        if choice and not stale else (4, "LANCZOS"))
+    return OCRSettings(
+        region=tuple(region) if region else None,
+        factor=factor, filter=resample, scale_stale=stale,
+        ensemble=bool(config.get("ocr_ensemble", True)),
+        consensus=int(config.get("ocr_consensus", 2)),
+        decoder=bool(config.get("ocr_decoder", True)))
+
+class CoordReader:
+    """The one way coordinates are read from a HUD crop, as configured.
+
+    With "ocr_decoder" on, per-character readings of the ensemble variants go through a
+    CoordDecoder; otherwise the variants vote ("ocr_consensus" must agree), or a single pass
+    is used when "ocr_ensemble" is off. The live loop, setup validation and the simulator all
+    read through this, so what setup measures is what navigation gets.
+
+    "ocr_consensus" applies in both modes: decoded coordinates must be a possible parse of that
+    many variants. The decoder is switched off for good only if Tesseract cannot produce hOCR;
+    any other decoder error falls back to the vote for DECODER_RETRY_SECONDS, then retries.
+
+    Reads only use the `settings` snapshot (see compile_ocr_settings); call compile() after
+    editing the config.
+    """
+    DECODER_RETRY_SECONDS = 30.0
+
+    def __init__(self, config, clock=None, log=print, metrics=None):
+        self.config = config
+        self.clock = clock or REAL_CLOCK
+        self.log = log
+        self.metrics = metrics
+        self.decoder = CoordDecoder(max_speed=float(config.get("ocr_max_speed", 30.0)))
+        self.decoder_failed = False
+        self.decoder_retry_at = None
+        self.compile()
+
+    def compile(self):
+        self.settings = compile_ocr_settings(self.config)
+        return self.settings
+
+    def scale_stale(self):
+        """True if the stored upscale choice was validated for a different OCR region."""
+        return self.settings.scale_stale
+
+    def scale(self):
+        """(factor, filter) validated for the current OCR region, or the safe 4x LANCZOS default."""
+        return self.settings.factor, self.settings.filter
+
+    def read(self, img, factor=None, resample=None, debug_path=None, track=True):
+        """Returns ((x, y, z) or None, raw_text) for a PIL crop, at the validated scale by default.
+
+        `track=False` decodes without the motion prior, for crops that are not consecutive frames.
+        """
+        st = self.settings
+        if factor is None: factor, resample = st.factor, st.filter
+        ensemble, min_agree = st.ensemble, st.consensus
+        if st.decoder and self.decoder_ready():
+            try:
+                readings = ocr_readings(img, debug_path=debug_path, factor=factor, resample=resample,
+                                        variants=OCR_ENSEMBLE if ensemble else OCR_ENSEMBLE[:1])
+                decoder = self.decoder if track else CoordDecoder(max_speed=self.decoder.max_speed)
+                coords, details = decoder.decode(readings, self.clock.now(), min_support=min_agree)
+                if details.get("outlier") and self.metrics: self.metrics.inc("ocr_outliers_total")
+                return coords, " | ".join("".join(c for c, _ in r) for r in readings)
+            except Exception as e:
+                self.decoder_error(e)
+        if ensemble:
+            return ocr_coords_ensemble(img, debug_path=debug_path, factor=factor, resample=resample,
+                                       min_agree=min_agree)
+        return ocr_coords(img, debug_path=debug_path, factor=factor, resample=resample)
+
+    def decoder_ready(self):
+        if self.decoder_failed: return False
+        if self.decoder_retry_at is not None and self.clock.now() < self.decoder_retry_at: return False
+        self.decoder_retry_at = None
+        return True
+
+    def decoder_error(self, e):
+        if isinstance(e, pytesseract.TesseractError) and "hocr" in str(e).lower():
+            # This Tesseract build cannot write hOCR: no point retrying this session
+            self.log(f"OCR decoder unavailable ({e}); falling back to plain parsing.")
+            self.decoder_failed = True
+        else:
+            self.log(f"OCR decoder error ({e}); plain parsing for {self.DECODER_RETRY_SECONDS:.0f}s.")
+            self.decoder_retry_at = self.clock.now() + self.DECODER_RETRY_SECONDS
+
+def select_ocr_scale(crops, labels, target_accuracy=0.95, factors=OCR_SCALE_FACTORS, filters=OCR_FILTER_COST,
+                     reader=None, min_labels=OCR_SCALE_MIN_LABELS):
+    """Finds the cheapest (factor, filter) whose exact-match accuracy on labelled crops meets the target.
+
+    Candidates are tried in order of pixel cost (factor^2 * filter cost), so the first one that
+    passes is the answer; if none does, the most accurate setting wins. Crops are read through
+    `reader` (a CoordReader, default settings if omitted), without the motion prior.
+
+    Returns (None, []) when the labels hold fewer than `min_labels` distinct readings: one
+    coordinate string says little about how a setting handles the others.
+    """
+    if len(set(map(tuple, labels))) < min_labels: return None, []
+    reader = reader or CoordReader({})
+    # At 1x nothing is resampled, so every filter reads the same image
+    cheapest = min(filters, key=lambda r: OCR_FILTER_COST[r])
+    candidates = sorted(((f, r) for f in factors for r in filters if f != 1 or r == cheapest),
+                        key=lambda c: c[0]**2 * OCR_FILTER_COST[c[1]])
+    table = []
+    for factor, resample in candidates:
+        hits = 0
+        for crop, label in zip(crops, labels):
+            coords, _ = reader.read(Image.fromarray(crop), factor, resample, track=False)
+            hits += coords is not None and all(abs(a - b) < 1e-6 for a, b in zip(coords, label))
+        accuracy = hits / len(crops) if crops else 0.0
+        table.append({"factor": factor, "filter": resample, "accuracy": round(accuracy, 3)})
+        if accuracy >= target_accuracy:
+            return table[-1], table
+    return max(table, key=lambda r: r["accuracy"]), table
+
+# --- Navigation ---
+class NavRunMetrics:
+    """Counters for one navigation run (calibration excluded), summarised when it ends."""
+    def __init__(self, target, now, wall=None):
+        self.target = tuple(target)
+        self.started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(wall))
+        self.start_time = now
+        self.ocr_reads = 0
+        self.failed_reads = 0
+        self.discarded_reads = 0
+        self.key_presses = 0
+        self.nudges = 0
+        self.stuck = 0
+        self.anti_drown_seconds = 0.0
+        self.path_length = 0.0
+        self.first = None
+        self.last = None
+
+    def on_read(self, coords, status):
+        self.ocr_reads += 1
+        if status == "no_read":
+            self.failed_reads += 1
+        elif status == "unstable":
+            self.discarded_reads += 1
+        else:
+            if self.first is None: self.first = coords
+            if self.last is not None:
+                self.path_length += ((coords[0] - self.last[0])**2 + (coords[2] - self.last[2])**2)**0.5
+            self.last = coords
+
+    def summary(self, reached, now):
+        straight = 0.0
+        if self.first is not None:
+            straight = ((self.last[0] - self.first[0])**2 + (self.last[2] - self.first[2])**2)**0.5
+        return {
+            "started": self.started,
+            "reached": reached,
+            "wall_seconds": round(now - self.start_time, 3),
+            "ocr_reads": self.ocr_reads,
+            "failed_reads": self.failed_reads,
+            "discarded_reads": self.discarded_reads,
+            "key_presses": self.key_presses,
+            "path_length": round(self.path_length, 2),
+            "straight_line": round(straight, 2),
+            "path_efficiency": round(straight / self.path_length, 3) if self.path_length > 0 else None,
+            "nudges": self.nudges,
+            "stuck": self.stuck,
+            "anti_drown_seconds": round(self.anti_drown_seconds, 3),
+            "target": list(self.target),
+            "final": list(self.last) if self.last is not None else None,
+        }
+
+def format_run_summary(summary):
+    """One-line human readable version of a NavRunMetrics summary."""
+    parts = [f"{'Reached' if summary['reached'] else 'Stopped'} in {summary['wall_seconds']:.1f}s",
+             f"reads {summary['ocr_reads']} ({summary['failed_reads']} failed, {summary['discarded_reads']} discarded)",
+             f"keys {summary['key_presses']}"]
+    if summary["path_efficiency"] is not None:
+        parts.append(f"path {summary['path_length']:.1f} vs {summary['straight_line']:.1f} "
+                     f"({summary['path_efficiency'] * 100:.0f}% eff)")
+    parts += [f"nudges {summary['nudges']}", f"stuck {summary['stuck']}", f"anti-drown {summary['anti_drown_seconds']:.1f}s"]
+    return " | ".join(parts)
+
+def append_run_history(summary, path=NAV_HISTORY_FILE):
+    """Appends a run summary as one JSON line."""
+    with open(path, "a") as f:
+        f.write(json.dumps(summary) + "\n")
+
+NavSettings = namedtuple("NavSettings", [
+    "target", "z_inc", "z_dec", "x_inc", "x_dec", "climb", "arrive", "pulse", "stability_jump",
+    "oscillation_window", "y_threshold", "models", "max_hold", "stuck_window", "stuck_ratio",
+    "recovery_radius"])
+
+def compile_nav_settings(config, target=None):
+    """Resolves everything the navigation tick needs from `config` into an immutable NavSettings.
+
+    Key tables are resolved to "key that increases/decreases Z or X"; `target` defaults to the
+    saved target_x/y/z. Rebuild it whenever the config or target changes instead of reading
+    config (or Tk widgets) every tick.
+    """
+    opposite = Navigator.OPPOSITE
+    keys = {"z": (None, None), "x": (None, None)}
+    for k, m in config.get("nav_mapping", {"w": "z-", "d": "x+", "space": "y+"}).items():
+        if m[:1] in keys and k in opposite:
+            keys[m[0]] = (k, opposite[k]) if m[1:] == "+" else (opposite[k], k)
+    if target is None:
+        target = (config.get("target_x", 0.0), config.get("target_y", 0.0), config.get("target_z", 0.0))
+    mode = config.get("nav_move_mode", "walk")
+    models = config.get("nav_velocity", {}).get(mode, {})
+    return NavSettings(
+        target=tuple(float(v) for v in target),
+        z_inc=keys["z"][0], z_dec=keys["z"][1], x_inc=keys["x"][0], x_dec=keys["x"][1],
+        climb=config.get("nav_mapping", {}).get("space", "y+"),
+        arrive=float(config.get("nav_arrive_threshold", 0.65)),
+        pulse=float(config.get("nav_pulse", 0.03)),
+        stability_jump=float(config.get("nav_stability_jump", 1.5)),
+        oscillation_window=max(3, int(config.get("nav_oscillation_window", 4))),
+        y_threshold=float(config.get("nav_threshold", 0.7)),
+        models=MappingProxyType({k: MappingProxyType(dict(v)) for k, v in models.items() if v}),
+        max_hold=float(config.get("nav_max_hold", 1.5)),
+        stuck_window=max(2, int(config.get("nav_stuck_window", 4))),
+        stuck_ratio=float(config.get("nav_stuck_ratio", 0.25)),
+        recovery_radius=float(config.get("nav_recovery_radius", 4.0)))
+
+class Navigator:
+    """Calibration and per-tick movement logic, kept free of UI code so it can drive the simulator.
+
+    `read_coords()` must return (x, y, z) or (None, None, None); every wait and timestamp goes
+    through `clock` so a VirtualClock can drive a simulated world instead of real time, and every
+    random choice (nudges, sidesteps) through `rng`. Accepted reads are appended to `trajectory`
+    (a TrajectoryStore) when one is given.
+
+    The tick itself only reads `settings` (see compile_nav_settings); call compile() after
+    editing the config.
+    """
+    OPPOSITE = {"w": "s", "s": "w", "a": "d", "d": "a"}
+    PERPENDICULAR = {"w": ("a", "d"), "s": ("a", "d"), "a": ("w", "s"), "d": ("w", "s")}
+    CAL_MAX_LATENCY = 0.25   # seconds; a longer fitted start-up delay means the rounds disagree
+    CAL_SPEED_RATIO = 1.5    # a key this many times slower than the fastest was obstructed
+    MODEL_GAIN = 0.3         # weight of one observed move in the online speed correction
+
+    def __init__(self, config, input_backend, read_coords, log=print, recorder=None,
+                 save_config=None, trajectory=None, clock=None, rng=None):
+        self.config = config
+        self.input = input_backend
+        self.read_coords = read_coords
+        self.log = log
+        self.clock = clock or REAL_CLOCK
+        self.rng = rng or random.Random()
+        self.sleep = self.clock.sleep
+        self.now = self.clock.now
+        self.recorder = recorder
+        self.save_config = save_config or (lambda: None)
+        self.coord_history = []
+        self.move_history = []
+        self.predicted = None
+        self.metrics = None
+        self.trajectory = trajectory
+        self.run_id = 0
+        self._store_error = None
+        self._tick_keys = set()
+        self._move_from = None
+        self._last_holds = {}
+        self._unconfirmed = None
+        self._model_dirty = False
+        self._progress = []
+        self._stuck = None
+        self._recoveries = []
+        self.settings = None
+
+    def compile(self, target=None):
+        """Rebuilds the settings snapshot, keeping the current target unless a new one is given."""
+        if target is None and self.settings is not None: target = self.settings.target
+        self.settings = compile_nav_settings(self.config, target)
+        return self.settings
+
+    def start_run(self, target=None):
+        """Starts collecting NavRunMetrics for a trip to `target` (default the compiled target)."""
+        st = self.compile(target) if target is not None or self.settings is None else self.settings
+        self.metrics = NavRunMetrics(st.target, self.now(), self.clock.wall())
+        if self.trajectory: self.run_id = self._store("next_run") or self.run_id
+        self._move_from, self._unconfirmed, self._progress, self._stuck = None, None, [], None
+
+    def finish_run(self, reached):
+        """Ends the current run and returns its summary (None if no run was active)."""
+        if self.metrics is None: return None
+        summary = self.metrics.summary(reached, self.now())
+        self.metrics = None
+        if self.trajectory: self._store("flush")
+        if self._model_dirty:
+            self._model_dirty = False
+            self.save_config()
+        return summary
+
+    def _store(self, method, *args, **kwargs):
+        """Calls a TrajectoryStore method; a failing store is logged, never fatal to navigation."""
+        try:
+            result = getattr(self.trajectory, method)(*args, **kwargs)
+            self._store_error = None
+            return result
+        except (OSError, ValueError, MemoryError) as e:
+            if str(e) != self._store_error: self.log(f"Trajectory store error ({method}): {e}")
+            self._store_error = str(e)
+            return None
+
+    def _record(self, decision):
+        if self.recorder: self.recorder.record(decision=decision)
+
+    def read(self):
+        """Reads coordinates and keeps the short history used by the stability check."""
+        c = self.read_coords()
+        if c[0] is not None:
+            self.coord_history.append(tuple(c))
+            if len(self.coord_history) > 5: self.coord_history.pop(0)
+        return c
+
+    def hold_keys(self, holds):
+        """Presses several keys together and releases each after its own duration."""
+        if not holds: return
+        if self.metrics: self.metrics.key_presses += len(holds)
+        self._tick_keys.update(holds)
+        events = [("key_down", k) for k in holds]
+        elapsed = 0.0
+        for k, t in sorted(holds.items(), key=lambda kv: kv[1]):
+            events += [("wait", max(0.0, t - elapsed)), ("key_up", k)]
+            elapsed = t
+        self.input.send(events)
+
+    def calibrate(self, max_retries=None):
+        """Learns key mappings with double-verification for maximum accuracy."""
+        self.sleep(3)
+        if not self.config.get("ocr_region"):
+            self.log("Calibration Failed: Select OCR region first.")
+            return False
+
+        def get_stable():
+            samples = []
+            for _ in range(5):
+                c = self.read()
+                if c[0] is not None: samples.append(c)
+                self.sleep(0.3)
+            if not samples: return [None, None, None]
+            return [round(sorted(axis)[len(axis)//2], 2) for axis in zip(*samples)]
+
+        def get_direction(p1, p2):
+            if p1[0] is None or p2[0] is None: return None
+            dx, dz = p2[0] - p1[0], p2[2] - p1[2]
+            if abs(dx) > abs(dz) and abs(dx) > 0.1: return f"x{'+' if dx > 0 else '-'}"
+            if abs(dz) > abs(dx) and abs(dz) > 0.1: return f"z{'+' if dz > 0 else '-'}"
+            return None
+
+        def get_distance(p1, p2, direction):
+            if p1[0] is None or p2[0] is None: return 0.0
+            axis = 0 if direction[0] == 'x' else 2
+            return abs(p2[axis] - p1[axis])
+
+        mapping = {"space": "y+"}
+        velocity = {}
+        # Two different hold lengths so speed and start-up latency can be separated
+        cal_pulses = (0.1, 0.4)
+
+        def measure(key):
+            """Two holds of `key`; returns (direction, fitted model) or (None, None) if they disagree."""
+            self.log(f"Calibration: Testing '{key.upper()}' - Round 1...")
+            p_start = get_stable()
+            self.hold_keys({key: cal_pulses[0]})
+            self.sleep(1.0)
+            p_mid = get_stable()
+            dir1 = get_direction(p_start, p_mid)
+            self.log(f"Round 1 -> {dir1 if dir1 else 'No Movement'}")
+
+            self.log(f"Calibration: Testing '{key.upper()}' - Round 2...")
+            self.hold_keys({key: cal_pulses[1]})
+            self.sleep(1.0)
+            p_final = get_stable()
+            dir2 = get_direction(p_mid, p_final)
+            self.log(f"Round 2 -> {dir2 if dir2 else 'No Movement'}")
+
+            if not dir1 or dir1 != dir2: return None, None
+            d1, d2 = get_distance(p_start, p_mid, dir1), get_distance(p_mid, p_final, dir1)
+            model = fit_velocity([(cal_pulses[0], d1), (cal_pulses[1], d2)])
+            # The longer hold has to go further, and the fit has to leave time to actually move
+            if d2 <= d1 or model["latency"] > self.CAL_MAX_LATENCY:
+                self.log(f"Calibration Warning: '{key.upper()}' rounds disagree "
+                         f"({d1:.2f} then {d2:.2f} units).")
+                return None, None
+            return dir1, model
+
+        # --- Verified Test for W and D (direction + velocity) ---
+        for key in ['w', 'd']:
+            attempts = 0
+            while True:
+                direction, model = measure(key)
+                if direction:
+                    mapping[key], velocity[key] = direction, model
+                    self.log(f"-> Verified {key.upper()} mapping: {direction} "
+                             f"({model['speed']:.2f} u/s, latency {model['latency']:.2f}s)")
+                    break
+                attempts += 1
+                if max_retries is not None and attempts > max_retries:
+                    self.log(f"Calibration Failed: '{key.upper()}' never produced consistent movement.")
+                    return False
+                self.log(f"Calibration Warning: '{key.upper()}' inconsistent or no movement. Retrying in 2s...")
+                self.sleep(2)
+
+        # Final check for mapping logic (X/Z should be different)
+        if mapping.get("w") and mapping.get("d"):
+            if mapping["w"][0] == mapping["d"][0]:
+                self.log("Mapping conflict (Both mapped to same axis). Resetting to fallback logic.")
+                if mapping["w"][0] == 'z': mapping["d"] = "x+"
+                else: mapping["d"] = "z-"
+
+        # --- S and A walk back along the same axes; a wall or water only shows up one way ---
+        for key in ['s', 'a']:
+            direction, model = measure(key)
+            back = mapping[self.OPPOSITE[key]]
+            if direction == back[0] + ('-' if back[1] == '+' else '+'):
+                velocity[key] = model
+                self.log(f"-> Measured {key.upper()}: {model['speed']:.2f} u/s, latency {model['latency']:.2f}s")
+            else:
+                velocity[key] = velocity[self.OPPOSITE[key]]
+                self.log(f"Calibration Warning: '{key.upper()}' did not move back along {back[0]}; "
+                         f"using the '{self.OPPOSITE[key].upper()}' fit.")
+
+        # Every direction moves at the same speed in-game, so a fit well below the fastest one
+        # was slowed by something in the way: take the fastest fit instead of trusting it.
+        fastest = max(velocity.values(), key=lambda m: m["speed"])
+        for key, model in velocity.items():
+            if model["speed"] * self.CAL_SPEED_RATIO < fastest["speed"]:
+                self.log(f"Calibration Warning: '{key.upper()}' measured {model['speed']:.2f} u/s "
+                         f"against {fastest['speed']:.2f} u/s; assuming it was obstructed.")
+                velocity[key] = dict(fastest)
+        mode = self.config.get("nav_move_mode", "walk")
+        self.config["nav_mapping"] = mapping
+        self.config.setdefault("nav_velocity", {})[mode] = velocity
+        self.compile()
+        self.save_config()
+        self.log(f"Calibration SUCCESS! Mapping: {mapping} (velocity learned for '{mode}' mode)")
+        return True
+
+    def step(self, target=None):
+        """Runs one navigation tick towards `target` (x, y, z), default the compiled target.
+
+        Returns (status, coords) where status is one of "no_read", "unstable",
+        "anti_drown", "stuck", "nudge", "move" or "reached".
+        """
+        st = self.settings or self.compile(target)
+        if target is not None and tuple(target) != st.target:
+            st = self.settings = st._replace(target=tuple(float(v) for v in target))
+        self._tick_keys = set()
+        status, coords = self._step(st)
+        if self.metrics: self.metrics.on_read(coords, status)
+        if self.trajectory and coords[0] is not None and status != "unstable":
+            self._store("append", self.now(), *coords, keys=self._tick_keys, state=status, run=self.run_id)
+        return status, coords
+
+    def _step(self, st):
+        cx, cy, cz = self.read()
+        if cx is None: return "no_read", (cx, cy, cz)
+        coords = (cx, cy, cz)
+        tx, ty, tz = st.target
+
+        # Tunable constants (see --autotune)
+        thres, jump, window = st.arrive, st.stability_jump, st.oscillation_window
+
+        # Stability Check: a reading far from both the previous one and where the last move
+        # should have taken us is discarded once; if the next reading agrees, it is accepted.
+        expected, self.predicted = self.predicted, None
+        if expected is not None and len(self.coord_history) >= 3:
+            last = self.coord_history[-2]
+            far = lambda p: abs(p[0] - cx) > jump or abs(p[2] - cz) > jump
+            if far(expected) and far(last):
+                self._unconfirmed = expected
+                return "unstable", coords
+        # A reading that confirms a discarded one still measures the move before it
+        if expected is None: expected, self._unconfirmed = self._unconfirmed, None
+
+        # Progress tracking: how far the last move should have taken us vs how far it did
+        if expected is not None and self._move_from is not None:
+            fx, _, fz = self._move_from
+            want = ((expected[0] - fx)**2 + (expected[2] - fz)**2)**0.5
+            got = ((cx - fx)**2 + (cz - fz)**2)**0.5
+            self._progress = (self._progress + [(want, got)])[-8:]
+            if self._stuck is not None and got > 0.25 and got >= st.stuck_ratio * want:
+                self._remember_recovery()
+            st = self._correct_model(st, coords)
+        self._move_from = None
+
+        # Movement Logic based on the learned mapping (resolved in compile_nav_settings)
+        z_act = (st.z_dec if cz > tz else st.z_inc) if abs(cz - tz) > thres else None
+        x_act = (st.x_dec if cx > tx else st.x_inc) if abs(cx - tx) > thres else None
+
+        # Anti-Drown
+        if cy < 0:
+            keys = ['space']
+            if abs(cz-tz) > thres: keys.append(z_act)
+            if abs(cx-tx) > thres: keys.append(x_act)
+            self._record("anti-drown")
+            t0 = self.now()
+            self.hold_keys({k: 0.3 for k in keys if k})
+            if self.metrics: self.metrics.anti_drown_seconds += self.now() - t0
+            return "anti_drown", coords
+
+        # Y Navigation (Ascend only)
+        need_up = (cy < ty and st.climb == "y+") or (cy > ty and st.climb == "y-")
+        if abs(cy - ty) > st.y_threshold and need_up:
+            self.input.press('space')
+            self._tick_keys.add('space')
+            if self.metrics: self.metrics.key_presses += 1
+        
+        # Normal Navigation (No longer elif - allows moving while jumping)
+        if not (z_act or x_act):
+            self._record("destination reached")
+            return "reached", coords
+
+        if self._check_stuck(st, coords, z_act, x_act):
+            return "stuck", coords
+
+        act = z_act or x_act
+        
+        # Anti-Oscillation Logic
+        self.move_history.append(act)
+        if len(self.move_history) > window + 2: self.move_history.pop(0)
+        
+        if len(self.move_history) >= window:
+            h = self.move_history
+            # Check for W-S or A-D alternating pattern over the last `window` moves
+            alternating = all(h[i] != h[i-1] for i in range(-(window - 2), 0))
+            is_ws = all(h[i] in ['w', 's'] for i in range(-window, 0)) and alternating
+            is_ad = all(h[i] in ['a', 'd'] for i in range(-window, 0)) and alternating
+            
+            if is_ws or is_ad:
+                self.log("Stuck detected (Oscillation)! Nudging...")
+                nudge_key = self.rng.choice(['w', 'a', 's', 'd'])
+                self._record(f"nudge {nudge_key}")
+                if self.metrics: self.metrics.nudges += 1
+                self.hold_keys({nudge_key: self.rng.uniform(0.2, 0.5)})
+                self.move_history = [] # Reset history
+                return "nudge", coords
+
+        # Dead-reckoning: hold each axis key long enough to cover the
+        # remaining distance, falling back to a short pulse if uncalibrated
+        models = st.models
+        holds = {}
+        predicted = [cx, cy, cz]
+        for act_key, axis, cur, tgt in ((z_act, 2, cz, tz), (x_act, 0, cx, tx)):
+            if not act_key: continue
+            holds[act_key] = hold_time(abs(cur - tgt) - thres / 2, models.get(act_key), st.pulse, st.max_hold)
+            model = models.get(act_key) or {}
+            moved = model.get("speed", 0.0) * max(0.0, holds[act_key] - model.get("latency", 0.0))
+            predicted[axis] = cur + (moved if tgt > cur else -moved)
+        self._record("move " + "+".join(sorted(holds)))
+        self.hold_keys(holds)
+        self.predicted = tuple(predicted)
+        self._move_from, self._last_holds = coords, holds
+        return "move", coords
+
+    def _correct_model(self, st, coords):
+        """Pulls each held key's speed towards what the last move actually covered.
+
+        Only moves that got somewhere count: a blocked move is the stuck detector's business, and
+        swimming is slower than the walking model is meant to describe. The opposite key shares the
+        axis and the correction; the config is updated and saved when the run finishes.
+        """
+        start = self._move_from
+        if coords[1] < 0 or start[1] < 0: return st
+        models = dict(st.models)
+        changed = False
+        for key, hold in self._last_holds.items():
+            model = models.get(key)
+            if not model: continue
+            active = hold - model.get("latency", 0.0)
+            if active < 0.2: continue
+            axis = 0 if key in (st.x_inc, st.x_dec) else 2
+            observed = abs(coords[axis] - start[axis]) / active
+            speed = model["speed"]
+            if observed < st.stuck_ratio * speed: continue
+            observed = min(observed, 2 * speed)  # one misread can only move the model so far
+            corrected = round(speed + self.MODEL_GAIN * (observed - speed), 3)
+            if abs(corrected - speed) < 0.01 * speed: continue
+            for k in (key, self.OPPOSITE[key]):
+                models[k] = MappingProxyType(dict(models.get(k) or model, speed=corrected))
+            changed = True
+        if not changed: return st
+        mode = self.config.get("nav_move_mode", "walk")
+        velocity = self.config.setdefault("nav_velocity", {}).setdefault(mode, {})
+        velocity.update({k: dict(m) for k, m in models.items()})
+        self._model_dirty = True
+        self.settings = st._replace(models=MappingProxyType(models))
+        return self.settings
+
+    def _check_stuck(self, st, coords, z_act, x_act):
+        """Velocity-based stuck detection: over the last `nav_stuck_window` moves we covered less
+        than `nav_stuck_ratio` of the predicted distance. Escalates through RECOVERY_STRATEGIES
+        (best known one for this spot first) and remembers which one got us moving again."""
+        window, ratio = st.stuck_window, st.stuck_ratio
+        h = self._progress
+        if len(h) < window: return False
+        want = sum(w for w, _ in h[-window:])
+        got = sum(g for _, g in h[-window:])
+        if want < 1.0 or got >= ratio * want: return False
+
+        cx, cy, cz = coords
+        if self._stuck is None:
+            act = z_act or x_act
+            self._stuck = {"pos": coords, "order": self._recovery_order(cx, cz, st.recovery_radius), "level": 0,
+                           "side": self.rng.choice(self.PERPENDICULAR[act])}
+        else:
+            self._stuck["level"] += 1
+        order = self._stuck["order"]
+        strategy = self._stuck["strategy"] = order[self._stuck["level"] % len(order)]
+        self.log(f"Stuck detected (moved {got:.1f} of {want:.1f})! Trying {strategy}...")
+        self._record(f"stuck {strategy}")
+        if self.metrics: self.metrics.stuck += 1
+        self._recover(strategy, z_act, x_act)
+        self._progress = []
+        return True
+
+    def _recovery_order(self, x, z, radius):
+        order = list(RECOVERY_STRATEGIES)
+        if self.trajectory:
+            winner = self._store("best_recovery", x, z, radius)
+        else:
+            near = [s for rx, rz, s in self._recoveries if (rx - x)**2 + (rz - z)**2 <= radius**2]
+            winner = max(set(near), key=near.count) if near else None
+        if winner:
+            self.log(f"Known stuck spot, trying {winner} first.")
+            order.remove(winner)
+            order.insert(0, winner)
+        return order
+
+    def _recover(self, strategy, z_act, x_act):
+        act = z_act or x_act
+        side = self._stuck["side"]
+        if strategy == "jump":
+            holds = {k: 0.6 for k in (z_act, x_act) if k}
+            holds["space"] = 0.35
+            self.hold_keys(holds)
+        elif strategy == "sidestep":
+            self.hold_keys({side: 0.5})
+        elif strategy == "back_off":
+            self.hold_keys({self.OPPOSITE[act]: 0.5})
+            self.hold_keys({side: 0.5})
+        else:
+            # Replan: back off and take a wide detour round the other side
+            other = self.OPPOSITE[side]
+            self.hold_keys({self.OPPOSITE[act]: 0.4})
+            self.hold_keys({other: 1.0})
+            self.hold_keys({other: 0.6, act: 0.6})
+
+    def _remember_recovery(self):
+        x, y, z = self._stuck["pos"]
+        strategy = self._stuck["strategy"]
+        self.log(f"Unstuck via {strategy}.")
+        if self.trajectory:
+            self._store("append", self.now(), x, y, z, state="recover_" + strategy, run=self.run_id)
+        else:
+            self._recoveries.append((x, z, strategy))
+        self._stuck = None
+
+# --- Recovery Controller ---
+RecoverySettings = namedtuple("RecoverySettings", [
+    "interval", "confidence", "wait_after_reconnect", "server_code", "macro_hotkey", "reconnect_image",
+    "reconnect_roi", "join_fast_type"])
+
+def compile_recovery_settings(config):
+    """Resolves what the reconnect and join side of the loop needs from `config` into an immutable
+    RecoverySettings; like compile_nav_settings, rebuild it when the config changes."""
+    roi = config.get("reconnect_roi")
+    return RecoverySettings(
+        interval=float(config.get("reconnect_interval", 10)),
+        confidence=float(config.get("confidence", 0.7)),
+        wait_after_reconnect=float(config.get("wait_after_reconnect", 30)),
+        server_code=str(config.get("server_code", "")),
+        macro_hotkey=str(config.get("macro_hotkey", "f1")),
+        reconnect_image=config.get("reconnect_image", "reconnect_button.png"),
+        reconnect_roi=tuple(roi) if roi else None,
+        join_fast_type=bool(config.get("join_fast_type", False)))
+
+class RecoveryController:
+    """The monitoring loop without any Tk: reconnect scan, rejoin and navigation on one clock.
+
+    SCGMreconnect.main_loop calls tick() from its worker thread and run_scenario drives the
+    same object against GPOSimulator. `positions` returns the saved click positions,
+    `join_steps` fixes the join steps (default: join_sequence.json, re-read on every join) and
+    `template` fixes the reconnect button image (default: the configured "reconnect_image").
+    Whoever shows state follows along through `on_event(kind, info)`; kinds are "disconnect",
+    "joined", "join_failed", "navigating", "position", "reached" and "nav_stopped".
+    Settings are read from a RecoverySettings snapshot; call compile() after changing the config.
+    """
+    MOVE_KEYS = ("w", "s", "a", "d", "space")
+
+    def __init__(self, config, input_backend, frames, read_coords, positions=None, join_steps=None,
+                 template=None, calibrate=True, clock=None, log=print, recorder=None, metrics=None,
+                 trajectory=None, save_config=None, on_event=None, rng=None):
+        self.config = config
+        self.input = input_backend
+        self.frames = frames
+        self.read_coords = read_coords
+        self.positions = positions or (lambda: {})
+        self.join_steps = join_steps
+        self.template = template
+        self.calibrate = calibrate
+        self.clock = clock or REAL_CLOCK
+        self.log = log
+        self.recorder = recorder
+        self.metrics = metrics or Metrics()
+        self.on_event = on_event or (lambda kind, info: None)
+        self.nav = Navigator(config, input_backend, read_coords, log=log, recorder=recorder,
+                             save_config=save_config, trajectory=trajectory, clock=self.clock, rng=rng)
+        self.nav.compile()
+        self.compile()
+        self.reconnect_active = self.joiner_active = self.nav_active = False
+        self.needs_calibration = False
+        self.disconnected = False
+        self.last_scan = float("-inf")
+        self._template_cache = (None, None, None)
+        # One join at a time, and a join's input never interleaves with a tick's (a manual join
+        # from the hotkey thread waits for the tick in flight; the tick thread re-enters for rejoin)
+        self._join_lock = threading.Lock()
+        self._tick_lock = threading.RLock()
+
+    def compile(self):
+        self.settings = compile_recovery_settings(self.config)
+        return self.settings
+
+    def emit(self, kind, **info):
+        self.on_event(kind, info)
+
+    def tick(self):
+        """One pass of the monitoring loop; the app calls it every 10 ms. Skipped while a join runs."""
+        if self.joining(): return
+        with self._tick_lock:
+            if self.reconnect_active and self.clock.now() - self.last_scan >= self.settings.interval:
+                self.last_scan = self.clock.now()
+                try:
+                    self.scan_reconnect()
+                except Exception as e:
+                    self.log(f"Reconnect Error: {e}")
+            if self.nav_active:
+                try:
+                    self.nav_tick()
+                except Exception as e:
+                    self.log(f"Navigation Error: {e}")
+                    self.clock.sleep(0.5)
+
+    def joining(self):
+        return self._join_lock.locked()
+
+    def report_incident(self, reason):
+        """Flushes the flight recorder to disk so the moments before an incident can be replayed."""
+        if not self.recorder: return None
+        try:
+            path = self.recorder.dump(reason)
+            self.log(f"Flight recorder saved: {path}")
+            return path
+        except Exception as e:
+            self.log(f"Flight Recorder Error: {e}")
+
+    # --- Reconnect ---
+    def needle(self):
+        """Reconnect button template (RGB array), or None if the configured image is missing."""
+        if self.template is not None: return self.template
+        img_path = self.settings.reconnect_image
+        if not os.path.exists(img_path):
+            self.log(f"Scanner Warning: Image file '{img_path}' NOT FOUND in folder!")
+            return None
+        mtime = os.path.getmtime(img_path)
+        if self._template_cache[:2] != (img_path, mtime):
+            self._template_cache = (img_path, mtime, np.asarray(Image.open(img_path).convert("RGB")))
+        return self._template_cache[2]
+
+    def locate_reconnect(self, confidence, max_age=0.5, snapshot=False):
+        """Template-matches the reconnect button against the shared frame (optionally a ROI).
+
+        Pass snapshot=True from threads other than the one running tick().
+        """
+        needle = self.needle()
+        if needle is None: return None
+        roi = self.settings.reconnect_roi
+        if snapshot:
+            haystack = self.frames.snapshot(roi or None, max_age)
+        else:
+            haystack = self.frames.view(roi, max_age) if roi else self.frames.frame(max_age)
+        off_x, off_y = (max(int(roi[0]), 0), max(int(roi[1]), 0)) if roi else (0, 0)
+        loc = locate_template(haystack, needle, confidence)
+        if loc: loc = (loc[0] + off_x, loc[1] + off_y, loc[2], loc[3])
+        return loc
+
+    def scan_reconnect(self):
+        """Looks for the Reconnect button once; clicks it (and rejoins) if found."""
+        t0 = time.perf_counter()
+        loc = self.locate_reconnect(self.settings.confidence, max_age=0.5)
+        self.metrics.observe("detection_seconds", time.perf_counter() - t0)
+        self.metrics.inc("reconnect_scans_total")
+        if self.recorder:
+            self.recorder.record(frame=self.frames.frame(max_age=1.0), decision="disconnect detected" if loc else "scan clear")
+        if not loc:
+            self.disconnected = False
+            return False
+
+        if self.disconnected:
+            # Same incident, the last click did not take: click again without another dump or alert
+            self.log("Reconnect button still visible; clicking again.")
+        else:
+            self.disconnected = True
+            self.report_incident("disconnect")
+            self.metrics.inc("reconnects_total")
+            # Stop current macro and Alert
+            m_key = self.settings.macro_hotkey
+            self.input.press(m_key)
+            self.log(f"DISCONNECT DETECTED! Stopping external macro via {m_key.upper()} and notifying Discord.")
+            self.emit("disconnect", location=loc)
+
+        self.input.send(click_events(loc[0] + loc[2] // 2, loc[1] + loc[3] // 2, times=2, settle=0.5))
+        self.log("Reconnect button clicked (2x).")
+        if self.joiner_active: self.rejoin()
+        return True
+
+    def focus_point(self):
+        """Saved "Game Window Focus Point", else the centre of the captured screen."""
+        p = self.positions().get("Game Window Focus Point", {})
+        fx, fy = p.get("x", -1), p.get("y", -1)
+        if fx == -1:
+            h, w = self.frames.frame(max_age=1.0).shape[:2]
+            fx, fy = w // 2, h // 2
+        return int(fx), int(fy)
+
+    def rejoin(self):
+        """Focuses the game after a reconnect click, then runs the join sequence."""
+        if not self._join_lock.acquire(blocking=False): return self._join_busy()
+        try:
+            with self._tick_lock:
+                wait = self.settings.wait_after_reconnect
+                self.log(f"Waiting {wait:g}s to trigger Join Sequence...")
+                self.clock.sleep(wait)
+                fx, fy = self.focus_point()
+                self.input.send([("move_to", fx, fy), ("mouse_down",), ("wait", 5), ("mouse_up",)])
+                return self._join()
+        finally:
+            self._join_lock.release()
+
+    def run_join_sequence(self):
+        """Runs the join steps and re-activates navigation; True if we got back into the world.
+
+        Safe to call from any thread: a join that starts while another is running is skipped.
+        """
+        if not self._join_lock.acquire(blocking=False): return self._join_busy()
+        try:
+            with self._tick_lock:
+                return self._join()
+        finally:
+            self._join_lock.release()
+
+    def _join_busy(self):
+        self.log("Join Sequence already running; skipped.")
+        return False
+
+    def _join(self):
+        try:
+            steps = self.join_steps if self.join_steps is not None else load_join_sequence()
+            seq = JoinSequence(steps, self.input, positions=self.positions(),
+                               variables={"server_code": self.settings.server_code},
+                               conditions={"coords_visible": lambda: self.read_coords()[0] is not None},
+                               config=self.config, fast_type=self.settings.join_fast_type,
+                               log=self.log, clock=self.clock)
+            missing = seq.missing_positions()
+            if missing:
+                for r in missing: self.log(f"Error: {r} position missing.")
+                return self._join_failed("missing positions")
+
+            self.log("Started Joining Sequence...")
+            join_start = self.clock.now()
+            ok, results = seq.run()
+            for r in results:
+                self.metrics.set(Metrics.series("join_step_seconds", step=r["name"]), r["seconds"])
+            self.log("Join steps: " + ", ".join(f"{r['name']} {r['seconds']:.1f}s" + ("" if r["ok"] else " FAILED")
+                                                for r in results))
+            if not ok:
+                self.log(f"Join Sequence Failed at '{results[-1]['name']}': {results[-1]['error']}")
+                return self._join_failed(results[-1]["name"], steps=results)
+
+            seconds = self.clock.now() - join_start
+            self.metrics.observe("rejoin_seconds", seconds)
+            self.metrics.inc("rejoins_total")
+            self.emit("joined", seconds=seconds, steps=results)
+            self.log("Re-activating Navigation Module...")
+            if not self.nav_active: self.start_navigation()
+            return True
+        except Exception as e:
+            self.log(f"Join Sequence Failed: {e}")
+            return self._join_failed(str(e))
+
+    def _join_failed(self, reason, steps=()):
+        self.report_incident("join failed")
+        self.emit("join_failed", reason=reason, steps=list(steps))
+        return False
+
+    # --- Navigation ---
+    def start_navigation(self):
+        """Arms navigation; the next tick learns the velocity model first (if `calibrate`)."""
+        self.nav_active = True
+        self.needs_calibration = self.calibrate
+        if not self.calibrate: self.nav.start_run()
+        self.emit("navigating", calibrating=self.calibrate)
+
+    def stop_navigation(self, reached=False):
+        """Disarms navigation, releases movement keys and returns the run summary (if a run was active)."""
+        self.nav_active = self.needs_calibration = False
+        self.input.send([("key_up", key) for key in self.MOVE_KEYS])
+        summary = self.nav.finish_run(reached=reached)
+        self.emit("nav_stopped", reached=reached, summary=summary)
+        return summary
+
+    def nav_tick(self):
+        if self.needs_calibration:
+            success = self.nav.calibrate()
+            self.needs_calibration = False
+            if not success:
+                self.log("Navigation Error: Calibration failed. Stopping Navigation.")
+                self.report_incident("calibration failed")
+                self.stop_navigation()
+                return "calibration_failed"
+            if self.nav_active:
+                self.log("Navigation: Map learning complete. Heading to Target.")
+                self.nav.start_run()
+                self.emit("navigating", calibrating=False)
+            return "calibrated"
+
+        tx, ty, tz = self.nav.settings.target
+        status, (cx, cy, cz) = self.nav.step()
+        self.metrics.inc(Metrics.series("nav_ticks_total", status=status))
+        if cx is not None:
+            dist = ((cx-tx)**2 + (cz-tz)**2)**0.5
+            self.metrics.set("nav_distance", dist)
+            self.emit("position", coords=(cx, cy, cz), distance=dist)
+
+        if status == "reached":
+            self.log(f"Destination Reached: X={cx:.2f}, Z={cz:.2f}")
+            self.stop_navigation(reached=True)
+            m_key = self.settings.macro_hotkey
+            self.input.press(m_key)
+            self.log(f"Restarting external macro via {m_key.upper()}.")
+            self.emit("reached", coords=(cx, cy, cz))
+        return status
+
+# --- Offline Simulator ---
+HUD_FONTS = ["arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf"]
+
+class GPOSimulator:
+    """Offline stand-in for GPO: character kinematics driven by key input plus a rendered HUD.
+
+    The world is flat land at `ground_y` except for `water` rectangles (x0, z0, x1, z1), where
+    the character sinks below y=0 unless space is held, and `obstacles` (x0, z0, x1, z1, height)
+    that block movement unless the character is high enough (jumping) to clear them.
+
+    It also models the session: disconnect() shows a Reconnect button, which leads to the
+    lobby. There, the server menu, textbox, code + enter and Fish Hub buttons (see
+    positions()) load back into the world after `load_seconds`.
+    """
+    OPPOSITE = {"w": "s", "s": "w", "a": "d", "d": "a"}
+    BUTTONS = {"reconnect": (0.40, 0.45), "1. Server Menu Button": (0.10, 0.85),
+               "2. TextBox Input Area": (0.50, 0.30), "3. Fish Hub Button": (0.50, 0.60),
+               "4. Running Man Button": (0.90, 0.85)}
+
+    def __init__(self, mapping=None, start=(0.0, 5.0, 0.0), walk_speed=16.0, run_speed=26.0,
+                 running=False, latency=0.05, ground_y=5.0, water=(), obstacles=(),
+                 screen=(640, 360), hud_region=(16, 12, 300, 28), dt=0.01, misread_rate=0.0, seed=None,
+                 server_code=None, load_seconds=20.0):
+        mapping = mapping or {"w": "z-", "d": "x+"}
+        self.axes = {}
+        for key, m in mapping.items():
+            if key not in self.OPPOSITE: continue
+            axis, sign = (0 if m[0] == 'x' else 2), (1.0 if m[1] == '+' else -1.0)
+            self.axes[key] = (axis, sign)
+            self.axes[self.OPPOSITE[key]] = (axis, -sign)
+        self.pos = np.array(start, dtype=float)
+        self.walk_speed, self.run_speed, self.running = walk_speed, run_speed, running
+        self.latency = latency
+        self.ground_y = ground_y
+        self.water = list(water)
+        self.obstacles = list(obstacles)
+        self.screen = screen
+        self.hud_region = tuple(hud_region)
+        self.dt = dt
+        self.gravity, self.jump_speed = 60.0, 16.0
+        self.sink_speed, self.swim_speed, self.water_factor = 2.0, 6.0, 0.6
+        self.vy = 0.0
+        self.time = 0.0
+        self.held = {}
+        self.misread_rate = misread_rate
+        self.rng = random.Random(seed)
+        self._background = None
+        self._font = None
+        self._pending = 0.0
+        self.state = "world"
+        self.server_code = server_code
+        self.load_seconds = load_seconds
+        self.load_until = 0.0
+        self.cursor = (0, 0)
+        self.typed = ""
+        self.code_ok = False
+        self._focused = self._select_all = False
+        w, h = screen
+        self.buttons = {name: (int(fx * w) - 50, int(fy * h) - 15, 100, 30) for name, (fx, fy) in self.BUTTONS.items()}
+
+    # --- Session ---
+    def positions(self):
+        """Button centres in the scgm_positions.json format."""
+        return {name: {"x": x + bw // 2, "y": y + bh // 2}
+                for name, (x, y, bw, bh) in self.buttons.items() if name != "reconnect"}
+
+    def disconnect(self):
+        self.state = "disconnected"
+        self.held.clear()
+        self.running = False
+
+    def click(self, x, y):
+        hit = next((n for n, (bx, by, bw, bh) in self.buttons.items()
+                    if bx <= x < bx + bw and by <= y < by + bh), None)
+        self._focused = hit == "2. TextBox Input Area" and self.state == "menu"
+        if self.state == "disconnected" and hit == "reconnect":
+            self.state, self.typed, self.code_ok = "lobby", "", False
+        elif self.state in ("lobby", "menu") and hit == "1. Server Menu Button":
+            self.state = "menu"
+        elif self.state == "menu" and hit == "3. Fish Hub Button" and self.code_ok:
+            self.state, self.load_until = "loading", self.time + self.load_seconds
+        elif self.state == "world" and hit == "4. Running Man Button":
+            self.running = True
+
+    def type_text(self, text):
+        if self._focused:
+            self.typed = "" if self._select_all else self.typed
+            self.typed += text
+            self._select_all = False
+
+    # --- Input ---
+    def key_down(self, key):
+        if key in self.held: return
+        self.held[key] = self.time
+        if self.state != "world":
+            if key == "a" and "ctrl" in self.held: self._select_all = True
+            elif key == "backspace": self.typed, self._select_all = ("" if self._select_all else self.typed[:-1]), False
+            elif key == "enter" and self._focused:
+                self.code_ok = self.server_code is None or self.typed == self.server_code
+            return
+        if key == "space": self._jump()
+
+    def key_up(self, key):
+        self.held.pop(key, None)
+
+    def _jump(self):
+        if not self.in_water() and self.pos[1] <= self.ground_y + 1e-6:
+            self.vy = self.jump_speed
+
+    # --- World ---
+    def in_water(self, x=None, z=None):
+        x = self.pos[0] if x is None else x
+        z = self.pos[2] if z is None else z
+        return any(x0 <= x <= x1 and z0 <= z <= z1 for x0, z0, x1, z1 in self.water)
+
+    def _blocked(self, p):
+        for x0, z0, x1, z1, height in self.obstacles:
+            if x0 <= p[0] <= x1 and z0 <= p[2] <= z1 and p[1] < self.ground_y + height:
+                return True
+        return False
+
+    def advance(self, seconds):
+        """Advances simulated time; used as the `sleep` of everything driving the simulator."""
+        self._pending += max(seconds, 0.0)
+        steps = int(self._pending / self.dt + 1e-9)
+        self._pending -= steps * self.dt
+        for _ in range(steps):
+            self._step(self.dt)
+
+    def _step(self, dt):
+        if self.state != "world":
+            if self.state == "loading" and self.time >= self.load_until: self.state = "world"
+            self.time += dt
+            return
+        water = self.in_water()
+        speed = self.run_speed if self.running else self.walk_speed
+        if water: speed *= self.water_factor
+        for key, since in self.held.items():
+            if key not in self.axes or self.time - since < self.latency: continue
+            axis, sign = self.axes[key]
+            cand = self.pos.copy()
+            cand[axis] += sign * speed * dt
+            if not self._blocked(cand): self.pos = cand
+
+        if self.in_water():
+            self.vy = 0.0
+            if "space" in self.held: self.pos[1] = min(self.pos[1] + self.swim_speed * dt, 0.5)
+            else: self.pos[1] = max(self.pos[1] - self.sink_speed * dt, -8.0)
+        else:
+            if self.pos[1] < self.ground_y and self.vy <= 0:
+                self.pos[1] = self.ground_y  # climbed out onto the shore
+            if self.vy > 0 or self.pos[1] > self.ground_y:
+                self.vy -= self.gravity * dt
+                self.pos[1] = max(self.pos[1] + self.vy * dt, self.ground_y)
+                if self.pos[1] <= self.ground_y: self.vy = 0.0
+            if "space" in self.held: self._jump()
+        self.time += dt
+
+    def read_direct(self):
+        """HUD values without OCR, with OCR-like failures injected at `misread_rate`."""
+        if self.state != "world": return (None, None, None)
+        values = [round(float(v), 1) for v in self.pos]
+        if self.rng.random() < self.misread_rate:
+            kind = self.rng.choice(["miss", "digit", "sign"])
+            if kind == "miss": return (None, None, None)
+            axis = self.rng.choice([0, 2])
+            # Dropped leading digit or lost minus sign, the usual Tesseract mistakes
+            values[axis] = float(str(abs(values[axis]))[1:] or 0) if kind == "digit" else abs(values[axis])
+        return tuple(values)
+
+    # --- Rendering ---
+    def hud_text(self):
+        x, y, z = self.pos
+        return f"X: {x:.1f}  Y: {y:.1f}  Z: {z:.1f}"
+
+    def _hud_font(self, height):
+        if self._font is None:
+            for name in HUD_FONTS:
+                try:
+                    self._font = ImageFont.truetype(name, max(10, int(height * 0.7)))
+                    break
+                except Exception:
+                    continue
+            else:
+                self._font = ImageFont.load_default()
+        return self._font
+
+    def render(self):
+        """Full-screen RGB frame with the coordinate HUD drawn at `hud_region`."""
+        w, h = self.screen
+        if self._background is None:
+            shade = np.linspace(90, 160, h, dtype=np.uint8)[:, None]
+            self._background = np.dstack([shade // 3, shade // 2, shade]).repeat(w, axis=1)
+        frame = self._background.copy()
+        if self.state == "disconnected":
+            x, y, bw, bh = self.buttons["reconnect"]
+            button = Image.new("RGB", (bw, bh), (40, 160, 70))
+            ImageDraw.Draw(button).text((bw // 2, bh // 2), "Reconnect", font=self._hud_font(bh * 0.7),
+                                        fill=(255, 255, 255), anchor="mm")
+            frame[y:y + bh, x:x + bw] = np.asarray(button)
+            return frame
+        if self.state != "world": return frame
+        left, top, hw, hh = self.hud_region
+        hud = Image.fromarray(frame[top:top + hh, left:left + hw])
+        draw = ImageDraw.Draw(hud)
+        draw.text((4, hh // 2), self.hud_text(), font=self._hud_font(hh), fill=(255, 255, 255),
+                  anchor="lm", stroke_width=1, stroke_fill=(0, 0, 0))
+        frame[top:top + hh, left:left + hw] = np.asarray(hud)
+        return frame
+
+def sim_clock(sim):
+    """VirtualClock starting at `sim`'s time whose sleeps advance the simulator."""
+    clock = VirtualClock(start=sim.time)
+    clock.on_advance(sim.advance)
+    return clock
+
+class SimInputBackend(InputBackend):
+    """Feeds input events into a GPOSimulator; waits advance simulated time instantly."""
+    def __init__(self, sim, event_delay=0.0, clock=None):
+        super().__init__(event_delay, clock or sim_clock(sim))
+        self.sim = sim
+
+    def dispatch(self, event):
+        kind = event[0]
+        if kind == "key_down": self.sim.key_down(event[1])
+        elif kind == "key_up": self.sim.key_up(event[1])
+        elif kind == "press":
+            self.sim.key_down(event[1]); self.sim.key_up(event[1])
+        elif kind == "write": self.sim.type_text(event[1])
+        elif kind == "move_to": self.sim.cursor = (event[1], event[2])
+        elif kind == "move_rel": self.sim.cursor = (self.sim.cursor[0] + event[1], self.sim.cursor[1] + event[2])
+        elif kind in ("click", "mouse_up"): self.sim.click(*self.sim.cursor)
+
+def run_simulation(sim, target, config=None, calibrate=True, use_ocr=True, max_steps=1000, log=None,
+                   read_seconds=0.12, trajectory=None, clock=None, rng=None):
+    """Runs calibration + navigation against `sim` and returns a result summary.
+
+    Each coordinate read advances simulated time by `read_seconds` (roughly one Tesseract call);
+    pass `rng` (a random.Random) to make the navigator's random choices reproducible.
+    """
+    clock = clock or sim_clock(sim)
+    sim_start = sim.time
+    cfg = {"nav_mapping": {"w": "z-", "d": "x+", "space": "y+"}, "nav_move_mode": "walk",
+           "nav_velocity": {"walk": {}, "run": {}}, "nav_max_hold": 1.5}
+    cfg.update(config or {})
+    cfg["ocr_region"] = list(sim.hud_region)
+    bus = FrameBus(capture=sim.render, clock=clock)
+    reader = CoordReader(cfg, clock=clock, log=log or (lambda m: None))
+
+    def read():
+        clock.sleep(read_seconds)
+        if not use_ocr: return sim.read_direct()
+        coords, _ = reader.read(Image.fromarray(bus.view(cfg["ocr_region"])))
+        return coords or (None, None, None)
+
+    nav = Navigator(cfg, SimInputBackend(sim, clock=clock), read, log=log or (lambda m: None),
+                    trajectory=trajectory, clock=clock, rng=rng)
+    wall_start = time.perf_counter()
+    calibrated = nav.calibrate(max_retries=3) if calibrate else True
+    cal_seconds = sim.time - sim_start
+    status, steps, run = "not_started", 0, None
+    if calibrated:
+        nav.start_run(target)
+        for steps in range(1, max_steps + 1):
+            status, _ = nav.step(target)
+            if status == "reached": break
+            if status in ("no_read", "unstable"): clock.sleep(0.01)
+        run = nav.finish_run(status == "reached")
+    return {
+        "reached": status == "reached",
+        "error": round(((sim.pos[0] - target[0])**2 + (sim.pos[2] - target[2])**2)**0.5, 3),
+        "calibrated": calibrated,
+        "steps": steps,
+        "calibration_sim_seconds": round(cal_seconds, 3),
+        "sim_seconds": round(sim.time - sim_start, 3),
+        "wall_seconds": round(time.perf_counter() - wall_start, 3),
+        "position": [round(float(v), 2) for v in sim.pos],
+        "mapping": cfg.get("nav_mapping"),
+        "velocity": cfg.get("nav_velocity", {}).get(cfg.get("nav_move_mode", "walk")),
+        "run": run,
+    }
+
+def run_scenario(sim, target, server_code="GPO123", config=None, use_ocr=True, calibrate=True, log=None,
+                 scan_interval=10.0, wait_after_reconnect=5, confidence=0.8, read_seconds=0.12, max_seconds=900.0,
+                 rng=None):
+    """Disconnect -> reconnect -> join -> navigate against `sim`, all on one VirtualClock.
+
+    Drives the app's own RecoveryController with simulated capture and input, so the whole
+    recovery runs in well under a second of real time. Reads cost `read_seconds` and `rng` is
+    used as in run_simulation.
+    """
+    log = log or (lambda m: None)
+    rng = rng or random.Random()
+    clock = sim_clock(sim)
+    backend = SimInputBackend(sim, clock=clock)
+    bus = FrameBus(capture=sim.render, clock=clock)
+    cfg = {"nav_move_mode": "walk", "ocr_region": list(sim.hud_region), "server_code": server_code,
+           "reconnect_interval": scan_interval, "wait_after_reconnect": wait_after_reconnect,
+           "confidence": confidence, "target_x": target[0], "target_y": target[1], "target_z": target[2]}
+    cfg.update(config or {})
+    sim.server_code = cfg["server_code"]
+    reader = CoordReader(cfg, clock=clock, log=log)
+
+    def read():
+        clock.sleep(read_seconds)
+        if not use_ocr: return sim.read_direct()
+        coords, _ = reader.read(Image.fromarray(bus.view(cfg["ocr_region"])))
+        return coords or (None, None, None)
+
+    sim.disconnect()
+    x, y, bw, bh = sim.buttons["reconnect"]
+    template = bus.grab()[y:y + bh, x:x + bw].copy()
+    events = {}
+    ctl = RecoveryController(cfg, backend, bus, read, positions=sim.positions, join_steps=DEFAULT_JOIN_SEQUENCE,
+                             template=template, calibrate=calibrate, clock=clock, log=log, rng=rng,
+                             on_event=lambda kind, info: events.setdefault(kind, (clock.now(), info)))
+    ctl.reconnect_active = ctl.joiner_active = True
+    wall_start, start = time.perf_counter(), clock.now()
+    # The disconnect lands at a random point of the scan interval
+    ctl.last_scan = start - scan_interval * rng.random()
+    while clock.now() - start < max_seconds:
+        ctl.tick()
+        if "nav_stopped" in events or "join_failed" in events: break
+        if ctl.last_scan >= start and "disconnect" not in events: break
+        clock.sleep(0.01)
+
+    result = {"reconnected": "disconnect" in events, "joined": "joined" in events,
+              "detect_seconds": round(events.get("disconnect", (clock.now(),))[0] - start, 3)}
+    if "joined" in events:
+        joined = events["joined"][1]
+        result["join_seconds"] = round(joined["seconds"], 3)
+        result["join_steps"] = joined["steps"]
+    elif "join_failed" in events:
+        result["join_steps"] = events["join_failed"][1]["steps"]
+    if "nav_stopped" in events:
+        nav = events["nav_stopped"][1]
+        result["navigation"] = {
+            "reached": nav["reached"],
+            "error": round(((sim.pos[0] - target[0])**2 + (sim.pos[2] - target[2])**2)**0.5, 3),
+            "calibrated": nav["summary"] is not None,
+            "position": [round(float(v), 2) for v in sim.pos],
+            "velocity": cfg.get("nav_velocity", {}).get(cfg.get("nav_move_mode", "walk")),
+            "run": nav["summary"],
+        }
+    result["sim_seconds"] = round(clock.now() - start, 3)
+    result["wall_seconds"] = round(time.perf_counter() - wall_start, 3)
+    return result
+
 class SelectionOverlay:
     """Semi-transparent overlay for selecting a region on screen."""
     def __init__(self, callback):
@@ -102,20 +2562,17 @@ class SelectionOverlay:
             self.callback((left, top, width, height))
 
 class SCGMreconnect(tk.Tk):
-    """Main application class for SCGMreconnect macro."""
-    def __init__(self):
+    """Main application class for SCGMreconnect macro.
+
+    The monitoring logic lives in a RecoveryController; `clock`, `input_backend` and `capture`
+    default to the real ones and can be swapped (e.g. for the simulator's).
+    """
+    def __init__(self, clock=None, input_backend=None, capture=None):
         super().__init__()
         self.title("GPO auto-reconnect")
         self.geometry("480x850")
         
-        # Internal State Management
-        self.reconnect_active = False
-        self.joiner_active = False
-        self.ocr_nav_active = False
-        self.needs_calibration = False
         self.log_text = None
-        self._coord_history = []
-        self._move_history = []
 
         # Default Configuration Parameters
         self.config = {
@@ -126,6 +2583,12 @@ class SCGMreconnect(tk.Tk):
             "confidence": 0.8,
             "always_on_top": True,
             "ocr_region": [0, 0, 100, 50],
+            "ocr_scale": None,
+            "ocr_accuracy_target": 0.95,
+            "ocr_ensemble": True,
+            "ocr_consensus": 2,
+            "ocr_decoder": True,
+            "ocr_max_speed": 30.0,
             "target_x": 0.0,
             "target_y": 0.0,
             "target_z": 0.0,
@@ -135,12 +2598,68 @@ class SCGMreconnect(tk.Tk):
                 "d": "x+",
                 "space": "y+"
             },
+            "nav_move_mode": "walk",
+            "nav_velocity": {"walk": {}, "run": {}},
+            "nav_max_hold": 1.5,
+            "nav_arrive_threshold": 0.65,
+            "nav_pulse": 0.03,
+            "nav_stability_jump": 1.5,
+            "nav_oscillation_window": 4,
+            "nav_stuck_window": 4,
+            "nav_stuck_ratio": 0.25,
+            "nav_recovery_radius": 4.0,
             "discord_webhook": "",
-            "macro_hotkey": "f1"
+            "macro_hotkey": "f1",
+            "input_event_delay": 0.05,
+            "join_fast_type": False,
+            "reconnect_roi": None,
+            "recorder_seconds": 60,
+            "recorder_mb": 32,
+            "recorder_max_incidents": 20,
+            "metrics_port": None,
+            "hotkeys": {
+                "join_test": "f8",
+                "setup_capture": "s",
+                "toggle_reconnect": "",
+                "toggle_joiner": "",
+                "toggle_navigation": ""
+            }
         }
         self.load_config()
+        self.clock = clock or REAL_CLOCK
+        self.input = input_backend or DirectInputBackend(event_delay=float(self.config.get("input_event_delay", 0.05)),
+                                                         clock=self.clock)
+        self.frames = FrameBus(capture=capture, clock=self.clock)
+        self.recorder = FlightRecorder(seconds=float(self.config.get("recorder_seconds", 60)),
+                                       max_mb=float(self.config.get("recorder_mb", 32)),
+                                       max_incidents=int(self.config.get("recorder_max_incidents", 20)), clock=self.clock)
+        self.reader = CoordReader(self.config, clock=self.clock, log=self.log)
+        try:
+            self.trajectory = TrajectoryStore(TRAJECTORY_FILE)
+        except (OSError, ValueError) as e:
+            self.trajectory = None
+            print(f"Trajectory Store Error: {e} (stuck spots are kept in memory only)")
+        self.metrics = Metrics()
+        self.reader.metrics = self.metrics
+        # Internal State Management (flags live on the controller, the UI mirrors its events)
+        self.controller = RecoveryController(self.config, self.input, self.frames, self.get_current_coords,
+                                             positions=self.saved_positions, clock=self.clock, log=self.log,
+                                             recorder=self.recorder, metrics=self.metrics,
+                                             trajectory=self.trajectory, save_config=self.write_config,
+                                             on_event=self.on_controller_event)
+        self.nav = self.controller.nav
+        self.metrics.add_collector(lambda: {
+            "reconnect_active": self.controller.reconnect_active,
+            "joiner_active": self.controller.joiner_active,
+            "nav_active": self.controller.nav_active,
+            "nav_calibrating": self.controller.nav_active and self.controller.needs_calibration,
+        })
+        self.metrics_server = None
         self.attributes("-topmost", self.config.get("always_on_top", True))
+        self.hotkeys = HotkeyListener(log=self.log, clock=self.clock)
         self.create_widgets()
+        self.start_metrics_server()
+        self.start_hotkeys()
         
         # Start background processing loop
         threading.Thread(target=self.main_loop, daemon=True).start()
@@ -155,7 +2674,7 @@ class SCGMreconnect(tk.Tk):
                 print(f"Config Load Error: {e}")
 
     def save_config(self):
-        """Saves current UI settings to JSON file."""
+        """Saves current UI settings to JSON file (UI thread only: reads every widget)."""
         try:
             self.config["server_code"] = self.entry_server_code.get()
             self.config["reconnect_interval"] = int(self.entry_interval.get())
@@ -166,17 +2685,46 @@ class SCGMreconnect(tk.Tk):
             self.config["target_z"] = self.safe_get_float(self.entry_target_z)
             self.config["discord_webhook"] = self.entry_discord.get().strip()
             self.config["macro_hotkey"] = self.entry_macro_key.get().strip().lower()
+            if hasattr(self, 'hotkey_entries'):
+                for action, entry in self.hotkey_entries.items():
+                    self.config["hotkeys"][action] = entry.get().strip().lower()
+                    self.hotkeys.rebind(action, self.config["hotkeys"][action])
+            if hasattr(self, 'var_running_man'):
+                self.config["nav_move_mode"] = "run" if self.var_running_man.get() else "walk"
             
             # Save Mapping from UI
             if hasattr(self, 'combo_w_map'):
                 self.config["nav_mapping"]["w"] = self.combo_w_map.get()
                 self.config["nav_mapping"]["d"] = self.combo_d_map.get()
             
-            with open(CONFIG_FILE, "w") as f:
-                json.dump(self.config, f, indent=4)
+            self.write_config()
+            self.nav.compile((self.config["target_x"], self.config["target_y"], self.config["target_z"]))
+            self.controller.compile()
+            self.reader.compile()
         except Exception as e:
             print(f"Config Save Error: {e}")
 
+    def write_config(self):
+        """Writes self.config as it stands, without touching widgets; safe from worker threads."""
+        try:
+            data = json.dumps(dict(self.config), indent=4)
+            with open(CONFIG_FILE, "w") as f:
+                f.write(data)
+        except Exception as e:
+            self.log(f"Config Save Error: {e}")
+
+    def refresh_settings(self, event=None):
+        """Recompiles the navigation, recovery and OCR snapshots from the entries after an edit,
+        so the worker loop never has to read Tk widgets (or the config)."""
+        target = tuple(self.safe_get_float(getattr(self, f"entry_target_{a}")) for a in "xyz")
+        self.config["target_x"], self.config["target_y"], self.config["target_z"] = target
+        if self.entry_interval.get().isdigit(): self.config["reconnect_interval"] = int(self.entry_interval.get())
+        if self.entry_wait_time.get().isdigit(): self.config["wait_after_reconnect"] = int(self.entry_wait_time.get())
+        self.config["server_code"] = self.entry_server_code.get()
+        self.nav.compile(target)
+        self.controller.compile()
+        self.reader.compile()
+
     def manual_save(self):
         self.save_config()
         self.log("Settings saved to config.")
@@ -254,6 +2802,18 @@ class SCGMreconnect(tk.Tk):
         self.entry_macro_key.insert(0, self.config.get("macro_hotkey", "f1"))
         self.entry_macro_key.pack(fill="x", pady=2)
 
+        hotkey_frame = ttk.LabelFrame(s_main, text="Hotkeys (blank = unbound, combos like ctrl+f8)", padding=10)
+        hotkey_frame.pack(fill="x", pady=5)
+        self.hotkey_entries = {}
+        labels = [("join_test", "Manual Join"), ("setup_capture", "Setup Capture"), ("toggle_reconnect", "Toggle Reconnect"),
+                  ("toggle_joiner", "Toggle Auto Joiner"), ("toggle_navigation", "Toggle Navigation")]
+        for row, (action, label) in enumerate(labels):
+            ttk.Label(hotkey_frame, text=f"{label}:").grid(row=row // 2, column=(row % 2) * 2, sticky="w")
+            entry = ttk.Entry(hotkey_frame, width=10)
+            entry.insert(0, self.config["hotkeys"].get(action, ""))
+            entry.grid(row=row // 2, column=(row % 2) * 2 + 1, padx=(2, 10), pady=1)
+            self.hotkey_entries[action] = entry
+
         ttk.Button(s_main, text="SAVE ALL SETTINGS", command=self.manual_save).pack(fill="x", pady=10)
 
         # --- TAB 2: AUTO RECONNECT ---
@@ -274,6 +2834,7 @@ class SCGMreconnect(tk.Tk):
         self.entry_interval = ttk.Entry(r_main)
         self.entry_interval.insert(0, str(self.config["reconnect_interval"]))
         self.entry_interval.pack(fill="x", pady=5)
+        self.entry_interval.bind("<KeyRelease>", self.refresh_settings)
 
         # Image Selection
         img_frame = ttk.LabelFrame(r_main, text="Recognition Image", padding=5)
@@ -344,15 +2905,19 @@ class SCGMreconnect(tk.Tk):
         self.entry_server_code = ttk.Entry(join_lf)
         self.entry_server_code.insert(0, self.config["server_code"])
         self.entry_server_code.pack(fill="x", pady=5)
+        self.entry_server_code.bind("<KeyRelease>", self.refresh_settings)
 
         ttk.Label(join_lf, text="Wait After Reconnect (s):").pack(anchor="w")
         self.entry_wait_time = ttk.Entry(join_lf)
         self.entry_wait_time.insert(0, str(self.config["wait_after_reconnect"]))
         self.entry_wait_time.pack(fill="x", pady=5)
+        self.entry_wait_time.bind("<KeyRelease>", self.refresh_settings)
 
         self.btn_join_toggle = ttk.Button(join_lf, text="ENABLE AUTO JOINER", command=self.toggle_joiner)
         self.btn_join_toggle.pack(fill="x", pady=5)
-        ttk.Button(join_lf, text="MANUAL JOIN TEST (F8)", command=self.test_join_manual).pack(fill="x")
+        join_key = self.config["hotkeys"].get("join_test", "").upper()
+        ttk.Button(join_lf, text=f"MANUAL JOIN TEST ({join_key})" if join_key else "MANUAL JOIN TEST",
+                   command=self.test_join_manual).pack(fill="x")
 
         # --- SECTION: COORDINATE NAVIGATION ---
         nav_lf = ttk.LabelFrame(rejoin_main, text="Step 2: Coordinate Navigation", padding=10)
@@ -372,6 +2937,9 @@ class SCGMreconnect(tk.Tk):
         self.lbl_live_coords.pack()
         self.lbl_live_dist = ttk.Label(live_lf, text="Distance to Target: -- m", font=("Segoe UI", 11, "bold"), foreground="#0078d7")
         self.lbl_live_dist.pack()
+        self.lbl_last_run = ttk.Label(live_lf, text="Last Run: --", font=("Segoe UI", 8), foreground="gray",
+                                      wraplength=380, justify="center")
+        self.lbl_last_run.pack()
 
         # Axis Config
         input_frame = ttk.Frame(nav_lf)
@@ -381,11 +2949,16 @@ class SCGMreconnect(tk.Tk):
             entry = ttk.Entry(input_frame, width=8)
             entry.insert(0, str(self.config.get(f"target_{axis.lower()}", 0.0)))
             entry.grid(row=0, column=i*2+1, padx=2)
+            entry.bind("<KeyRelease>", self.refresh_settings)
             setattr(self, f"entry_target_{axis.lower()}", entry)
 
         ttk.Button(nav_lf, text="Select X, Y, Z Region (OCR Selection)", command=self.select_ocr_region).pack(fill="x", pady=2)
         ttk.Button(nav_lf, text="Test OCR Reading", command=self.test_ocr).pack(fill="x", pady=2)
         ttk.Button(nav_lf, text="Set Current Coords as Target", command=self.set_current_as_target).pack(fill="x", pady=2)
+
+        self.var_running_man = tk.BooleanVar(value=self.config.get("nav_move_mode", "walk") == "run")
+        ttk.Checkbutton(nav_lf, text="Running Man active (use run speeds)", variable=self.var_running_man,
+                        command=self.save_config).pack(anchor="w", pady=2)
         
         self.btn_ocr_toggle = ttk.Button(nav_lf, text="ENABLE AUTO NAVIGATION", command=self.toggle_ocr_nav)
         self.btn_ocr_toggle.pack(fill="x", pady=(5, 5))
@@ -447,22 +3020,28 @@ class SCGMreconnect(tk.Tk):
         self.log_text.config(state='disabled')
         print(full_msg, end='')
 
-    def send_discord(self, message, screenshot=False):
+    def send_discord(self, message, screenshot=False, max_age=1.0):
         """Sends an asynchronous Discord webhook notification with optional screenshot."""
         webhook = self.config.get("discord_webhook")
         if not webhook: return
+
+        thumb = None
+        if screenshot:
+            # Reuse this tick's frame, copied since the bus buffer is overwritten later
+            try:
+                thumb = Image.fromarray(self.frames.snapshot(max_age=max_age))
+            except Exception as e:
+                print(f"Discord Capture Error: {e}")
         
         def _send():
             try:
                 payload = {"content": f"**[GPO auto-reconnect]** {message}"}
-                if screenshot:
-                    # Capture and save temp image
-                    img = pyautogui.screenshot()
-                    tmp_file = "discord_alert.png"
-                    img.save(tmp_file)
-                    with open(tmp_file, "rb") as f:
-                        requests.post(webhook, data=payload, files={"file": f}, timeout=10)
-                    if os.path.exists(tmp_file): os.remove(tmp_file)
+                if thumb is not None:
+                    thumb.thumbnail((1280, 1280))
+                    buf = io.BytesIO()
+                    thumb.save(buf, format="PNG")
+                    buf.seek(0)
+                    requests.post(webhook, data=payload, files={"file": ("discord_alert.png", buf, "image/png")}, timeout=10)
                 else:
                     requests.post(webhook, json=payload, timeout=5)
             except Exception as e:
@@ -475,8 +3054,8 @@ class SCGMreconnect(tk.Tk):
         self.save_config()
 
     def toggle_reconnect(self):
-        self.reconnect_active = not self.reconnect_active
-        if self.reconnect_active:
+        self.controller.reconnect_active = not self.controller.reconnect_active
+        if self.controller.reconnect_active:
             self.save_config()
             self.btn_rec_toggle.config(text="STOP RECONNECT")
             self.lbl_status_rec.config(text="Active", foreground="green")
@@ -536,26 +3115,51 @@ class SCGMreconnect(tk.Tk):
         self.log(f"Debug: Scanning for '{img_path}' (conf: {conf})...")
         
         try:
-            # Try once with standard
-            loc = pyautogui.locateOnScreen(img_path, confidence=conf)
+            # Try once with a fresh frame
+            loc = self.controller.locate_reconnect(conf, max_age=0.0, snapshot=True)
             if loc:
                 self.log(f"Debug: SUCCESS! Pattern found at {loc}")
                 # Visual feedback
                 center = pyautogui.center(loc)
-                pyautogui.moveTo(center.x, center.y)
+                self.input.move_to(center.x, center.y)
             else:
                 self.log("Debug: Failed to detect. Try lowering Confidence or taking a cleaner screenshot.")
                 # Fallback check - can it even see the screen?
                 try:
-                    pyautogui.screenshot("debug_view.png")
+                    Image.fromarray(self.frames.snapshot(max_age=1.0)).save("debug_view.png")
                     self.log("Debug: Screenshot saved as 'debug_view.png' - check if it's black/weird.")
                 except: pass
         except Exception as e:
             self.log(f"Debug Error: {e}")
 
+    def start_metrics_server(self):
+        """Starts the local metrics/control endpoint if `metrics_port` is configured."""
+        port = self.config.get("metrics_port")
+        if port in (None, ""): return
+
+        def control(flag, toggle):
+            # Toggles touch Tk widgets, so hand them to the UI thread
+            def put(enabled):
+                if enabled != getattr(self.controller, flag): self.after(0, toggle)
+            return (lambda: getattr(self.controller, flag), put)
+
+        try:
+            self.metrics_server = MetricsServer(self.metrics, {
+                "reconnect": control("reconnect_active", self.toggle_reconnect),
+                "joiner": control("joiner_active", self.toggle_joiner),
+                "navigation": control("nav_active", self.toggle_ocr_nav),
+            }, port=int(port)).start()
+            self.log(f"Metrics endpoint: http://127.0.0.1:{self.metrics_server.port}/metrics")
+        except Exception as e:
+            self.log(f"Metrics Server Error: {e}")
+
+    def report_incident(self, reason):
+        """Flushes the flight recorder to disk so the moments before an incident can be replayed."""
+        return self.controller.report_incident(reason)
+
     def toggle_joiner(self):
-        self.joiner_active = not self.joiner_active
-        if self.joiner_active:
+        self.controller.joiner_active = not self.controller.joiner_active
+        if self.controller.joiner_active:
             self.save_config()
             self.btn_join_toggle.config(text="STOP AUTO JOIN")
             self.lbl_status_join.config(text="Waiting for reconnect", foreground="green")
@@ -566,25 +3170,80 @@ class SCGMreconnect(tk.Tk):
             self.log("Auto Joiner: DISABLED")
 
     def test_join_manual(self):
-        self.log("Manual Join Test Triggered...")
-        threading.Thread(target=self.run_join_sequence, daemon=True).start()
+        self.hotkeys.trigger("join_test")
+
+    def start_hotkeys(self):
+        """Registers every hotkey action on the shared listener and installs the keyboard hook."""
+        keys = self.config["hotkeys"]
+
+        def manual_join():
+            self.log("Manual Join Test Triggered...")
+            self.controller.run_join_sequence()
+
+        # The join sequence gets its own queue so it never blocks toggles or setup captures
+        self.hotkeys.register("join_test", keys.get("join_test"), manual_join, queue_name="join", coalesce=True)
+        self.hotkeys.register("toggle_reconnect", keys.get("toggle_reconnect"), lambda: self.after(0, self.toggle_reconnect))
+        self.hotkeys.register("toggle_joiner", keys.get("toggle_joiner"), lambda: self.after(0, self.toggle_joiner))
+        self.hotkeys.register("toggle_navigation", keys.get("toggle_navigation"), lambda: self.after(0, self.toggle_ocr_nav))
+        self.hotkeys.rebind("setup_capture", keys.get("setup_capture", "s"))
+        try:
+            self.hotkeys.start()
+        except Exception as e:
+            self.log(f"Hotkey Listener Error: {e}")
 
     def toggle_ocr_nav(self):
-        self.ocr_nav_active = not self.ocr_nav_active
-        if self.ocr_nav_active:
+        if not self.controller.nav_active:
             self.save_config()
-            self.btn_ocr_toggle.config(text="STOP NAVIGATION")
-            self.lbl_status_ocr.config(text="Calibrating...", foreground="orange")
             self.log("Navigation: ENABLED (Auto-Calibration in progress...)")
-            self.needs_calibration = True
+            self.controller.start_navigation()
+            if self.reader.scale_stale():
+                self.log("OCR region changed since the last upscale check; re-validating.")
+                threading.Thread(target=self.validate_ocr_scale, daemon=True).start()
+        else:
+            self.log("Navigation: DISABLED")
+            self.controller.stop_navigation()
+
+    def show_nav_state(self, calibrating=False):
+        if self.controller.nav_active:
+            self.btn_ocr_toggle.config(text="STOP NAVIGATION")
+            if calibrating: self.lbl_status_ocr.config(text="Calibrating...", foreground="orange")
+            else: self.lbl_status_ocr.config(text="Active", foreground="green")
         else:
             self.btn_ocr_toggle.config(text="START NAVIGATION")
             self.lbl_status_ocr.config(text="Inactive", foreground="red")
-            self.log("Navigation: DISABLED")
-            self.needs_calibration = False
-            self.after(0, lambda: self.lbl_live_coords.config(text="Current Coords: X: --, Y: --, Z: --"))
-            self.after(0, lambda: self.lbl_live_dist.config(text="Distance to Target: -- m"))
-            for key in ['w', 's', 'a', 'd', 'space']: pydirectinput.keyUp(key)
+            self.lbl_live_coords.config(text="Current Coords: X: --, Y: --, Z: --")
+            self.lbl_live_dist.config(text="Distance to Target: -- m")
+
+    def on_controller_event(self, kind, info):
+        """Mirrors RecoveryController events in the UI (always via the Tk thread) and on Discord."""
+        if kind == "disconnect":
+            self.send_discord("⚠️ **Detected Disconnection!** Stopping external macro and attempting to reconnect...", screenshot=True)
+        elif kind == "joined":
+            if self.config.get("nav_move_mode") == "run":
+                self.after(0, lambda: self.var_running_man.set(True))
+        elif kind == "navigating":
+            self.after(0, lambda: self.show_nav_state(calibrating=info["calibrating"]))
+        elif kind == "position":
+            c, d = info["coords"], info["distance"]
+            self.after(0, lambda: self.lbl_live_coords.config(text=f"Current: X:{c[0]:.1f} Y:{c[1]:.1f} Z:{c[2]:.1f}"))
+            self.after(0, lambda: self.lbl_live_dist.config(text=f"Distance to Target: {d:.2f} m"))
+        elif kind == "nav_stopped":
+            self.after(0, self.show_nav_state)
+            self.report_run(info["summary"])
+        elif kind == "reached":
+            cx, cz = info["coords"][0], info["coords"][2]
+            self.send_discord(f"✅ **Destination Reached!** (X:{cx:.2f}, Z:{cz:.2f}). External macro started.", screenshot=True)
+
+    def report_run(self, summary):
+        """Shows a navigation run summary in the UI and appends it to the history file."""
+        if not summary: return
+        line = format_run_summary(summary)
+        self.log(f"Navigation Run: {line}")
+        self.after(0, lambda: self.lbl_last_run.config(text=f"Last Run: {line}"))
+        try:
+            append_run_history(summary)
+        except Exception as e:
+            self.log(f"Run History Error: {e}")
 
     def select_ocr_region(self):
         SelectionOverlay(self.set_ocr_region_callback)
@@ -593,68 +3252,71 @@ class SCGMreconnect(tk.Tk):
         self.config["ocr_region"] = region
         self.save_config()
         self.log(f"OCR Region locked: {region}")
-
-    def get_current_coords(self, save_debug=False):
-        """Reads coordinates using Tesseract with 4x enhancement and Inversion."""
+        threading.Thread(target=self.validate_ocr_scale, daemon=True).start()
+
+    def validate_ocr_scale(self, samples=8, attempts=60):
+        """Labels live HUD crops with the 4x LANCZOS reading, then keeps the cheapest setting that matches.
+
+        Runs alongside calibration, which walks the character around, and keeps one crop per
+        distinct reading. Both the labels and the candidates are read through self.reader, the
+        same path navigation uses.
+        """
+        region = list(self.config.get("ocr_region") or [])
+        if not region: return
+        self.log("OCR Setup: Testing upscale factors on the selected region...")
+        crops, labels = [], []
+        for _ in range(attempts):
+            if len(crops) >= samples: break
+            crop = self.frames.snapshot(region)
+            label, _ = self.reader.read(Image.fromarray(crop), 4, "LANCZOS", track=False)
+            if label and label not in labels:
+                crops.append(crop)
+                labels.append(label)
+            self.clock.sleep(0.5)
+
+        target = float(self.config.get("ocr_accuracy_target", 0.95))
+        best, table = select_ocr_scale(crops, labels, target, reader=self.reader)
+        if best is None:
+            self.log(f"OCR Setup: Only {len(labels)} distinct readings (was the character moving?), keeping "
+                     f"4x LANCZOS. Check the region with 'Test OCR Reading'.")
+            self.config["ocr_scale"] = None
+            self.write_config()
+            self.reader.compile()
+            return
+        self.config["ocr_scale"] = {"region": region, "factor": best["factor"], "filter": best["filter"],
+                                    "accuracy": best["accuracy"], "samples": len(crops)}
+        self.write_config()
+        self.reader.compile()
+        self.log(f"OCR Setup: Using {best['factor']}x {best['filter']} ({best['accuracy']*100:.0f}% exact on "
+                 f"{len(crops)} samples, tried {len(table)} settings).")
+
+    def get_current_coords(self, save_debug=False, max_age=0.0, snapshot=False):
+        """Reads coordinates using Tesseract with the validated upscale setting and Inversion.
+
+        The worker reads views of the shared frame; other threads pass snapshot=True.
+        """
         try:
-            region = self.config.get("ocr_region")
+            region = self.reader.settings.region
             if not region: return None, None, None
             
-            # Capture
-            screenshot = pyautogui.screenshot(region=region)
-            
-            # Enhancement: Upscale 4x
-            w, h = screenshot.size
-            screenshot = screenshot.resize((w*4, h*4), Image.Resampling.LANCZOS)
-            
-            # Enhancement: Invert (Black text on White)
-            screenshot = screenshot.convert('L')
-            screenshot = ImageOps.invert(screenshot)
-            
-            # Enhancement: High Contrast
-            enhancer = ImageEnhance.Contrast(screenshot)
-            screenshot = enhancer.enhance(3.0)
-            screenshot = screenshot.point(lambda p: 255 if p > 160 else 0)
-            
-            if save_debug:
-                screenshot.save("debug_ocr.png")
-            
-            # Tesseract OCR (PSM 7 is best for single lines/fragments)
-            custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.xyz:- '
-            text = pytesseract.image_to_string(screenshot, config=custom_config).lower()
+            # Capture (fresh unless max_age allows reuse)
+            t0 = time.perf_counter()
+            crop = self.frames.snapshot(region, max_age) if snapshot else self.frames.view(region, max_age)
+            debug_path = "debug_ocr.png" if save_debug else None
+            coords, text = self.reader.read(Image.fromarray(crop), debug_path=debug_path)
+            self.metrics.observe("ocr_seconds", time.perf_counter() - t0)
+            self.metrics.inc("ocr_reads_total")
+            if not coords: self.metrics.inc("ocr_failures_total")
             
             if save_debug: self.log(f"OCR Raw Text: {text.strip()}")
 
-            # Cleanup x, y, z labels
-            text = re.sub(r'[xyz%:]', ' ', text)
-            
-            # Fix misread minus signs (sometimes read as ' ' or '.' depending on font)
-            # In Tesseract, we search for numbers. If navigation is messed up, 
-            # we'll tweak this regex further.
-            num_pattern = r'([-.]?\s*\d+\.\d+|[-.]?\s*\d+)'
-            raw_nums = re.findall(num_pattern, text)
-            
-            nums = []
-            for n in raw_nums:
-                try:
-                    clean_n = n.replace(" ", "")
-                    # Small GPO fix: lone '.' usually means '-' for the Z coord
-                    if clean_n.startswith('.'): clean_n = '-' + clean_n[1:]
-                    
-                    if clean_n and clean_n != "-":
-                        val = float(clean_n)
-                        # Filter single digit labels
-                        if abs(val) < 10 and "." not in clean_n: continue
-                        nums.append(val)
-                except: continue
-
-            if len(nums) >= 3:
-                # Update history for stability check in main_loop
-                self._coord_history.append((nums[0], nums[1], nums[2]))
-                if len(self._coord_history) > 5: self._coord_history.pop(0)
+            frame = self.frames.snapshot(max_age=1.0) if snapshot else self.frames.frame(max_age=1.0)
+            if coords:
+                self.recorder.record(frame=frame, crop=crop, coords=coords, decision="ocr ok")
                 # Return direct values (No Averaging)
-                return nums[0], nums[1], nums[2]
+                return coords
             
+            self.recorder.record(frame=frame, crop=crop, decision="ocr failed")
             return None, None, None
         except Exception as e:
             if save_debug: self.log(f"OCR Error: {e}")
@@ -663,7 +3325,7 @@ class SCGMreconnect(tk.Tk):
     def test_ocr(self):
         """Manual test button to verify OCR reading with debug image."""
         self.log("Testing OCR reading with debug image...")
-        cx, cy, cz = self.get_current_coords(save_debug=True)
+        cx, cy, cz = self.get_current_coords(save_debug=True, snapshot=True)
         if cx is not None:
             self.log(f"Success! Found Coords -> X:{cx:.1f} Y:{cy:.1f} Z:{cz:.1f}")
             messagebox.showinfo("OCR Success", f"X: {cx:.2f}\nY: {cy:.2f}\nZ: {cz:.2f}\n\nCheck 'debug_ocr.png' for the image used.")
@@ -672,12 +3334,13 @@ class SCGMreconnect(tk.Tk):
             messagebox.showwarning("OCR Failed", "Could not read 3 numbers.\nOpen 'debug_ocr.png' in your folder to see if the region is correct!")
 
     def set_current_as_target(self):
-        x, y, z = self.get_current_coords()
+        x, y, z = self.get_current_coords(snapshot=True)
         if x is not None:
             for axis, val in zip(['x', 'y', 'z'], [x, y, z]):
                 entry = getattr(self, f"entry_target_{axis}")
                 entry.delete(0, tk.END)
                 entry.insert(0, f"{val:.2f}")
+            self.refresh_settings()
             self.log(f"New Target Locked: X={x:.2f}, Y={y:.2f}, Z={z:.2f}")
         else:
             self.log("Set Target Failed: Could not read coordinates.")
@@ -690,381 +3353,206 @@ class SCGMreconnect(tk.Tk):
         self.save_config()
         self.log("Navigation mapping set to GPO Defaults: W=z-, D=x+")
 
-    def calibration_thread(self):
-        """Learns key mappings with double-verification for maximum accuracy."""
-        time.sleep(3)
-        if not self.config.get("ocr_region"):
-            self.log("Calibration Failed: Select OCR region first.")
-            return False
-
-        def get_stable():
-            samples = []
-            for _ in range(5):
-                c = self.get_current_coords()
-                if c[0] is not None: samples.append(c)
-                time.sleep(0.3)
-            if not samples: return [None, None, None]
-            return [round(sorted(axis)[len(axis)//2], 2) for axis in zip(*samples)]
-
-        def get_direction(p1, p2):
-            if p1[0] is None or p2[0] is None: return None
-            dx, dz = p2[0] - p1[0], p2[2] - p1[2]
-            if abs(dx) > abs(dz) and abs(dx) > 0.1: return f"x{'+' if dx > 0 else '-'}"
-            if abs(dz) > abs(dx) and abs(dz) > 0.1: return f"z{'+' if dz > 0 else '-'}"
-            return None
-
-        mapping = {"space": "y+"}
-        cal_pulse = 0.1
-        
-        # --- Verified Test for W ---
-        while True:
-            self.log("Calibration: Testing 'W' - Round 1...")
-            p_start = get_stable()
-            pydirectinput.keyDown('w'); time.sleep(cal_pulse); pydirectinput.keyUp('w')
-            time.sleep(1.0)
-            p_mid = get_stable()
-            dir1 = get_direction(p_start, p_mid)
-            
-            self.log(f"Round 1 -> {dir1 if dir1 else 'No Movement'}")
-            
-            self.log("Calibration: Testing 'W' - Round 2...")
-            pydirectinput.keyDown('w'); time.sleep(cal_pulse); pydirectinput.keyUp('w')
-            time.sleep(1.0)
-            p_final = get_stable()
-            dir2 = get_direction(p_mid, p_final)
-            
-            self.log(f"Round 2 -> {dir2 if dir2 else 'No Movement'}")
-
-            if dir1 and dir1 == dir2:
-                mapping["w"] = dir1
-                self.log(f"-> Verified W mapping: {dir1}")
-                break
-            self.log("Calibration Warning: 'W' inconsistent or no movement. Retrying in 2s...")
-            time.sleep(2)
-
-        # --- Verified Test for D ---
-        while True:
-            self.log("Calibration: Testing 'D' - Round 1...")
-            p_start = get_stable()
-            pydirectinput.keyDown('d'); time.sleep(cal_pulse); pydirectinput.keyUp('d')
-            time.sleep(1.0)
-            p_mid = get_stable()
-            dir1 = get_direction(p_start, p_mid)
-            
-            self.log(f"Round 1 -> {dir1 if dir1 else 'No Movement'}")
-            
-            self.log("Calibration: Testing 'D' - Round 2...")
-            pydirectinput.keyDown('d'); time.sleep(cal_pulse); pydirectinput.keyUp('d')
-            time.sleep(1.0)
-            p_final = get_stable()
-            dir2 = get_direction(p_mid, p_final)
-            
-            self.log(f"Round 2 -> {dir2 if dir2 else 'No Movement'}")
-
-            if dir1 and dir1 == dir2:
-                # Basic conflict resolution
-                mapping["d"] = dir1
-                self.log(f"-> Verified D mapping: {dir1}")
-                break
-            self.log("Calibration Warning: 'D' inconsistent or no movement. Retrying in 2s...")
-            time.sleep(2)
-
-        # Final check for mapping logic (X/Z should be different)
-        if mapping.get("w") and mapping.get("d"):
-            if mapping["w"][0] == mapping["d"][0]:
-                self.log("Mapping conflict (Both mapped to same axis). Resetting to fallback logic.")
-                if mapping["w"][0] == 'z': mapping["d"] = "x+"
-                else: mapping["d"] = "z-"
-
-        self.config["nav_mapping"] = mapping
-        self.save_config()
-        self.log(f"Calibration SUCCESS! Mapping: {mapping}")
-        return True
-
     def start_single_setup(self, step_name):
-        self.setup_buttons[step_name].config(text=f"PRESS 'S' AT CURSOR")
-        threading.Thread(target=self.single_setup_thread, args=(step_name,), daemon=True).start()
+        key = self.hotkeys.binding_for("setup_capture") or "s"
+        self.setup_buttons[step_name].config(text=f"PRESS '{key.upper()}' AT CURSOR")
+        self.hotkeys.once(key, lambda: self.capture_setup_position(step_name))
 
-    def single_setup_thread(self, step_name):
-        while True:
-            if keyboard.is_pressed('s'):
-                pos = pyautogui.position()
-                saved_pos = {}
-                if os.path.exists(POS_FILE):
-                    try: 
-                        with open(POS_FILE, "r") as f: saved_pos = json.load(f)
-                    except: pass
-                saved_pos[step_name] = {"x": pos[0], "y": pos[1]}
-                with open(POS_FILE, "w") as f: json.dump(saved_pos, f)
-                
-                self.log(f"Position Saved: {step_name}")
-                self.after(0, self.update_setup_status)
-                break
-            time.sleep(0.05)
-
-    def run_join_sequence(self):
-        """Automated sequence to join a private server."""
-        if not os.path.exists(POS_FILE):
-             messagebox.showwarning("Incomplete Setup", "Please set button positions first!")
-             return
-             
-        try:
-            with open(POS_FILE, "r") as f: pos = json.load(f)
-            req = ["1. Server Menu Button", "2. TextBox Input Area", "3. Fish Hub Button", "4. Running Man Button"]
-            for r in req:
-                if r not in pos:
-                    self.log(f"Error: {r} position missing.")
-                    return
-
-            self.log("Started Joining Sequence...")
-            pydirectinput.PAUSE = 0.1
-            
-            # 1. Click Menu
-            m = pos["1. Server Menu Button"]
-            pydirectinput.moveTo(int(m['x']), int(m['y']))
-            time.sleep(1)
-            pydirectinput.moveRel(2, 2); pydirectinput.moveRel(-2, -2)
-            for _ in range(3):
-                pydirectinput.click()
-                time.sleep(0.3)
-            self.log("Clicked Menu (3x). Waiting 8s...")
-            time.sleep(8)
-            
-            # 2. Focus TextBox
-            b = pos["2. TextBox Input Area"]
-            pydirectinput.moveTo(int(b['x']), int(b['y']))
-            time.sleep(1)
-            pydirectinput.moveRel(2, 2); pydirectinput.moveRel(-2, -2)
-            for _ in range(3):
-                pydirectinput.click()
-                time.sleep(0.3)
-            self.log("Focused TextBox (3x). Waiting 8s...")
-            time.sleep(8)
-            
-            # 3. Enter Server Code
-            server_code = self.entry_server_code.get()
-            self.log(f"Entering Code: {server_code}...")
-            
-            # Clear textbox first (Ctrl+A + Backspace)
-            pydirectinput.click() # One more click to be sure
-            pydirectinput.keyDown('ctrl')
-            pydirectinput.press('a')
-            pydirectinput.keyUp('ctrl')
-            pydirectinput.press('backspace')
-            time.sleep(0.5)
-
-            # Type with delay
-            for char in server_code:
-                pyautogui.write(char)
-                time.sleep(0.1)
-                
-            time.sleep(1)
-            pydirectinput.press('enter')
-            self.log("Code submitted. Waiting 8s...")
-            time.sleep(8)
-            
-            # 4. Click Fish Hub
-            fh = pos["3. Fish Hub Button"]
-            pydirectinput.moveTo(int(fh['x']), int(fh['y']))
-            time.sleep(1)
-            pydirectinput.moveRel(2, 2); pydirectinput.moveRel(-2, -2)
-            for _ in range(3):
-                pydirectinput.click()
-                time.sleep(0.3)
-            
-            self.log("Join Sequence complete. Loading map (45s)...")
-            time.sleep(45) # Wait for world load
-
-            # 5. Pre-Navigation Adjustments
-            if "4. Running Man Button" in pos:
-                rm = pos["4. Running Man Button"]
-                self.log("Activating Running Man (3x)...")
-                pydirectinput.moveTo(int(rm['x']), int(rm['y']))
-                time.sleep(1)
-                pydirectinput.moveRel(2, 2); pydirectinput.moveRel(-2, -2)
-                for _ in range(3):
-                    pydirectinput.click()
-                    time.sleep(0.3)
-                time.sleep(2)
-
-            self.log("Running Post-Join Key Sequence...")
-            pydirectinput.keyDown('shift')
-            time.sleep(1)
-            pydirectinput.press('f3'); time.sleep(8)
-            for i in range(4):
-                pydirectinput.press('1'); time.sleep(2)
-            pydirectinput.keyUp('shift')
-            
-            self.log("Re-activating Navigation Module...")
-            if not self.ocr_nav_active: self.after(0, self.toggle_ocr_nav)
+    def capture_setup_position(self, step_name):
+        pos = pyautogui.position()
+        saved_pos = {}
+        if os.path.exists(POS_FILE):
+            try: 
+                with open(POS_FILE, "r") as f: saved_pos = json.load(f)
+            except: pass
+        saved_pos[step_name] = {"x": pos[0], "y": pos[1]}
+        with open(POS_FILE, "w") as f: json.dump(saved_pos, f)
+        
+        self.log(f"Position Saved: {step_name}")
+        self.after(0, self.update_setup_status)
 
-        except Exception as e:
-            self.log(f"Join Sequence Failed: {e}")
+    def saved_positions(self):
+        """Click positions captured in setup ({} until the first one is saved)."""
+        if not os.path.exists(POS_FILE): return {}
+        with open(POS_FILE, "r") as f: return json.load(f)
 
     def main_loop(self):
-        """Global monitoring loop for Reconnect and Navigation logic."""
-        time.sleep(2)
-        last_rec_check = 0
+        """Worker thread: drives the RecoveryController (reconnect scan, join, navigation)."""
+        self.clock.sleep(2)
         while True:
-            if not hasattr(self, 'reconnect_active'):
-                time.sleep(0.5); continue
-            
-            now = time.time()
-            # 1. Reconnect Logic
-            interval = int(self.entry_interval.get() if self.entry_interval.get().isdigit() else 10)
-            if self.reconnect_active and (now - last_rec_check >= interval):
-                last_rec_check = now
-                img_path = self.config.get("reconnect_image", "reconnect_button.png")
-                
-                if not os.path.exists(img_path):
-                    self.log(f"Scanner Warning: Image file '{img_path}' NOT FOUND in folder!")
-                    continue
-                
-                try:
-                    # self.log(f"Scanning for {img_path}...") # Debug log
-                    conf = float(self.config.get("confidence", 0.7))
-                    loc = pyautogui.locateOnScreen(img_path, confidence=conf)
-                    if loc:
-                            # Stop current macro and Alert
-                            m_key = self.config.get("macro_hotkey", "f1")
-                            pydirectinput.press(m_key)
-                            self.log(f"DISCONNECT DETECTED! Stopping external macro via {m_key.upper()} and notifying Discord.")
-                            self.send_discord("⚠️ **Detected Disconnection!** Stopping external macro and attempting to reconnect...", screenshot=True)
-                            
-                            center = pyautogui.center(loc)
-                            pydirectinput.moveTo(int(center.x), int(center.y))
-                            time.sleep(0.5)
-                            pydirectinput.moveRel(2, 2); pydirectinput.moveRel(-2, -2)
-                            for _ in range(2):
-                                pydirectinput.click()
-                                time.sleep(0.3)
-                            self.log("Reconnect button clicked (2x).")
-                            
-                            if self.joiner_active:
-                                wait = int(self.entry_wait_time.get())
-                                self.log(f"Waiting {wait}s to trigger Join Sequence...")
-                                time.sleep(wait)
-                                # Focus window
-                                fx, fy = -1, -1
-                                if os.path.exists(POS_FILE):
-                                    with open(POS_FILE, "r") as f:
-                                        p = json.load(f).get("Game Window Focus Point", {})
-                                        fx, fy = p.get('x', -1), p.get('y', -1)
-                                if fx != -1: pydirectinput.moveTo(fx, fy)
-                                else: pydirectinput.moveTo(pyautogui.size()[0]//2, pyautogui.size()[1]//2)
-                                pydirectinput.mouseDown(); time.sleep(5); pydirectinput.mouseUp()
-                                self.run_join_sequence()
-                except: pass
+            self.controller.tick()
+            self.clock.sleep(0.01)
+
+# --- Autotuning ---
+AUTOTUNE_REPORT_FILE = "autotune_report.json"
+NAV_TUNING_DEFAULTS = {"nav_pulse": 0.03, "nav_stability_jump": 1.5, "nav_oscillation_window": 4,
+                       "nav_max_hold": 1.5, "nav_stuck_window": 4, "nav_stuck_ratio": 0.25}
+# nav_arrive_threshold is deliberately not searched: it is how precise the user wants arrival
+# to be, and a looser one always "arrives" sooner. Trials keep the user's value.
+NAV_TUNING_SPACE = {
+    "nav_pulse": [0.02, 0.03, 0.05, 0.08],
+    "nav_stability_jump": [1.0, 1.5, 2.5, 4.0],
+    "nav_oscillation_window": [4, 6, 8],
+    "nav_max_hold": [0.75, 1.0, 1.5, 2.5],
+    "nav_stuck_window": [3, 4, 6],
+    "nav_stuck_ratio": [0.15, 0.25, 0.4],
+}
+
+def tuning_scenarios(count=6, seed=1):
+    """Reproducible simulated worlds/targets used to score navigation parameters."""
+    rng = random.Random(seed)
+    scenarios = []
+    for i in range(count):
+        water = [(rng.uniform(8, 20), -200.0, rng.uniform(24, 30), 200.0)] if i % 2 else []
+        obstacles = [(rng.uniform(-20, 20), rng.uniform(-20, 20), 0, 0, 1.5) for _ in range(2)]
+        obstacles = [(x, z, x + 3, z + 3, h) for x, z, _, _, h in obstacles]
+        target = (rng.uniform(-50, 50), 5.0, rng.uniform(-50, 50))
+        scenarios.append({"seed": seed * 100 + i, "water": water, "obstacles": obstacles, "target": target})
+    return scenarios
+
+def evaluate_nav_params(params, scenarios, base_config, accuracy=1.0, misread_rate=0.05, use_ocr=False):
+    """Scores one parameter set: mean time-to-target (failures and misses count as timeouts).
+
+    Each scenario's navigator gets its own RNG seeded from the scenario, so every parameter set
+    faces the same nudges and sidesteps without touching the global `random` state.
+    """
+    cfg = dict(base_config)
+    cfg.update(params)
+    times, reads, sim_total, failures = [], 0, 0.0, 0
+    for sc in scenarios:
+        sim = GPOSimulator(water=sc["water"], obstacles=sc["obstacles"], misread_rate=misread_rate, seed=sc["seed"])
+        res = run_simulation(sim, sc["target"], config=json.loads(json.dumps(cfg)), calibrate=False,
+                             use_ocr=use_ocr, max_steps=400, rng=random.Random(sc["seed"]))
+        run = res["run"] or {}
+        ok = res["reached"] and res["error"] <= accuracy
+        failures += 0 if ok else 1
+        times.append(run.get("wall_seconds", 0.0) if ok else 120.0)
+        reads += run.get("ocr_reads", 0) - run.get("failed_reads", 0) - run.get("discarded_reads", 0)
+        sim_total += run.get("wall_seconds", 0.0)
+    return {
+        "time_to_target": round(sum(times) / len(times), 3),
+        "valid_reads_per_second": round(reads / sim_total, 3) if sim_total else 0.0,
+        "failures": failures,
+    }
+
+def autotune_navigation(base_config, scenarios, passes=2, log=print, **kwargs):
+    """Coordinate descent over NAV_TUNING_SPACE, starting from the current settings."""
+    best = {k: base_config.get(k, NAV_TUNING_DEFAULTS[k]) for k in NAV_TUNING_SPACE}
+    baseline = evaluate_nav_params(best, scenarios, base_config, **kwargs)
+    best_score, evaluations = baseline, 1
+    for p in range(passes):
+        for name, values in NAV_TUNING_SPACE.items():
+            for value in values:
+                if value == best[name]: continue
+                trial = dict(best, **{name: value})
+                score = evaluate_nav_params(trial, scenarios, base_config, **kwargs)
+                evaluations += 1
+                if (score["failures"], score["time_to_target"]) < (best_score["failures"], best_score["time_to_target"]):
+                    best, best_score = trial, score
+                    log(f"Autotune: {name}={value} -> {score['time_to_target']:.2f}s to target")
+    return {"baseline": baseline, "best": best_score, "params": best, "evaluations": evaluations}
+
+def load_detection_corpus(folder):
+    """Loads frames from <folder>/positive (button visible) and <folder>/negative."""
+    corpus = []
+    for label in ("positive", "negative"):
+        sub = os.path.join(folder, label)
+        if not os.path.isdir(sub): continue
+        for name in sorted(os.listdir(sub)):
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
+                corpus.append((np.asarray(Image.open(os.path.join(sub, name)).convert("RGB")), label == "positive"))
+    return corpus
+
+def autotune_detection(needle, corpus, confidences=None):
+    """Picks the template-match confidence with the best F1 (ties go to the stricter value)."""
+    confidences = confidences or [round(0.5 + 0.05 * i, 2) for i in range(10)]
+    # One match per frame; every threshold is then just a comparison on the peak score
+    peaks = []
+    for frame, positive in corpus:
+        result = cv2.matchTemplate(frame, needle, cv2.TM_CCOEFF_NORMED)
+        peaks.append((cv2.minMaxLoc(result)[1], positive))
+    table = []
+    for conf in confidences:
+        tp = sum(1 for peak, pos in peaks if pos and peak >= conf)
+        fp = sum(1 for peak, pos in peaks if not pos and peak >= conf)
+        fn = sum(1 for peak, pos in peaks if pos and peak < conf)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        table.append({"confidence": conf, "precision": round(precision, 3), "recall": round(recall, 3), "f1": round(f1, 3)})
+    best = max(table, key=lambda r: (r["f1"], r["confidence"]))
+    return {"best": best, "table": table, "frames": len(peaks)}
+
+def run_autotune(config_path=CONFIG_FILE, corpus=None, scenarios=6, use_ocr=False, accuracy=1.0, log=print):
+    """Tunes navigation (simulated worlds) and detection (frame corpus), saves the winners and a report."""
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, "r") as f: config = json.load(f)
+
+    # Learn mapping/velocity once on a clean world, then reuse it for every trial
+    cal = run_simulation(GPOSimulator(), (0.0, 5.0, 0.0), use_ocr=use_ocr)
+    base = {"nav_mapping": cal["mapping"], "nav_move_mode": "walk", "nav_velocity": {"walk": cal["velocity"]}}
+    base.update({k: config[k] for k in list(NAV_TUNING_SPACE) + ["nav_arrive_threshold"] if k in config})
+
+    log("Autotune: tuning navigation in the simulator...")
+    nav = autotune_navigation(base, tuning_scenarios(scenarios), log=log, use_ocr=use_ocr, accuracy=accuracy)
+    report = {"navigation": nav}
+    config.update(nav["params"])
+
+    if corpus:
+        img_path = config.get("reconnect_image", "reconnect_button.png")
+        frames = load_detection_corpus(corpus)
+        if frames and os.path.exists(img_path):
+            log(f"Autotune: scoring detection confidence on {len(frames)} frames...")
+            det = autotune_detection(np.asarray(Image.open(img_path).convert("RGB")), frames)
+            report["detection"] = det
+            config["confidence"] = det["best"]["confidence"]
+        else:
+            log("Autotune: detection skipped (empty corpus or missing reconnect image).")
 
-            # 2. Navigation Logic
-            if self.ocr_nav_active:
-                if self.needs_calibration:
-                    success = self.calibration_thread()
-                    self.needs_calibration = False
-                    if not success:
-                        self.log("Navigation Error: Calibration failed. Stopping Navigation.")
-                        self.after(0, self.toggle_ocr_nav)
-                        continue
-                    if self.ocr_nav_active:
-                        self.lbl_status_ocr.config(text="Active", foreground="green")
-                        self.log("Navigation: Map learning complete. Heading to Target.")
-                    continue
+    with open(config_path, "w") as f: json.dump(config, f, indent=4)
+    with open(AUTOTUNE_REPORT_FILE, "w") as f: json.dump(report, f, indent=4)
+    log(f"Autotune: time to target {nav['baseline']['time_to_target']:.2f}s -> {nav['best']['time_to_target']:.2f}s "
+        f"({nav['evaluations']} evaluations). Saved to {config_path}, report in {AUTOTUNE_REPORT_FILE}.")
+    return report
 
-                cx, cy, cz = self.get_current_coords()
-                if cx is not None:
-                    # Update Live Tracker UI
-                    tx, ty, tz = self.safe_get_float(self.entry_target_x), self.safe_get_float(self.entry_target_y), self.safe_get_float(self.entry_target_z)
-                    dist = ((cx-tx)**2 + (cz-tz)**2)**0.5
-                    self.after(0, lambda c=(cx,cy,cz), d=dist: self.lbl_live_coords.config(text=f"Current: X:{c[0]:.1f} Y:{c[1]:.1f} Z:{c[2]:.1f}"))
-                    self.after(0, lambda d=dist: self.lbl_live_dist.config(text=f"Distance to Target: {d:.2f} m"))
-                    
-                    # Stability Check
-                    if len(self._coord_history) >= 3:
-                        last = self._coord_history[-1]
-                        if abs(last[0] - cx) > 1.5 or abs(last[2] - cz) > 1.5:
-                            continue
-
-                    tx, ty, tz = self.safe_get_float(self.entry_target_x), self.safe_get_float(self.entry_target_y), self.safe_get_float(self.entry_target_z)
-                    thres, pulse = 0.65, 0.03
-                    mapping = self.config.get("nav_mapping", {"w": "z-", "d": "x+", "space": "y+"})
-                    
-                    # Movement Logic based on Learned Mapping
-                    # Find which keys move Z and X
-                    z_key, z_dir = None, None
-                    x_key, x_dir = None, None
-                    
-                    for k, m in mapping.items():
-                        if m.startswith('z'):
-                            z_key, z_dir = k, m[1:]
-                        elif m.startswith('x'):
-                            x_key, x_dir = k, m[1:]
-                    
-                    # Determine Z action
-                    z_act = None
-                    if z_key and abs(cz - tz) > thres:
-                        # if mapping is z-, it means pressing z_key decreases Z
-                        # so if current Z > target Z, we need to decrease Z -> press z_key
-                        if z_dir == '-': z_act = z_key if cz > tz else ('s' if z_key == 'w' else 'w')
-                        else: z_act = z_key if cz < tz else ('s' if z_key == 'w' else 'w')
-                        
-                    # Determine X action
-                    x_act = None
-                    if x_key and abs(cx - tx) > thres:
-                        if x_dir == '-': x_act = x_key if cx > tx else ('a' if x_key == 'd' else 'd')
-                        else: x_act = x_key if cx < tx else ('a' if x_key == 'd' else 'd')
-
-                    # Anti-Drown
-                    if cy < 0:
-                        keys = ['space']
-                        if abs(cz-tz) > thres: keys.append(z_act)
-                        if abs(cx-tx) > thres: keys.append(x_act)
-                        for k in keys: pydirectinput.keyDown(k)
-                        time.sleep(0.3)
-                        for k in keys: pydirectinput.keyUp(k)
-                        continue
-
-                    # Y Navigation (Ascend only)
-                    need_up = (cy < ty and mapping.get("space") == "y+") or (cy > ty and mapping.get("space") == "y-")
-                    if abs(cy - ty) > 0.7 and need_up:
-                        pydirectinput.press('space')
-                    
-                    # Normal Navigation (No longer elif - allows moving while jumping)
-                    if z_act or x_act:
-                        act = z_act or x_act
-                        
-                        # Anti-Oscillation Logic
-                        self._move_history.append(act)
-                        if len(self._move_history) > 6: self._move_history.pop(0)
-                        
-                        if len(self._move_history) >= 4:
-                            h = self._move_history
-                            # Check for W-S or A-D alternating pattern
-                            is_ws = all(h[i] in ['w', 's'] for i in range(-4, 0)) and h[-1] != h[-2] and h[-2] != h[-3]
-                            is_ad = all(h[i] in ['a', 'd'] for i in range(-4, 0)) and h[-1] != h[-2] and h[-2] != h[-3]
-                            
-                            if is_ws or is_ad:
-                                self.log("Stuck detected (Oscillation)! Nudging...")
-                                nudge_key = random.choice(['w', 'a', 's', 'd'])
-                                pydirectinput.keyDown(nudge_key)
-                                time.sleep(random.uniform(0.2, 0.5))
-                                pydirectinput.keyUp(nudge_key)
-                                self._move_history = [] # Reset history
-                                continue
-
-                        pydirectinput.keyDown(act); time.sleep(pulse); pydirectinput.keyUp(act)
-                    else:
-                        self.log(f"Destination Reached: X={cx:.2f}, Z={cz:.2f}")
-                        m_key = self.config.get("macro_hotkey", "f1")
-                        pydirectinput.press(m_key)
-                        self.log(f"Restarting external macro via {m_key.upper()}.")
-                        self.send_discord(f"✅ **Destination Reached!** (X:{cx:.2f}, Z:{cz:.2f}). External macro started.", screenshot=True)
-                        self.toggle_ocr_nav()
-
-            if keyboard.is_pressed('f8'):
-                self.run_join_sequence()
-                time.sleep(2)
-            time.sleep(0.01)
+def demo_world():
+    """Small default world for --simulate: a water channel and a low wall on the way to the target."""
+    return GPOSimulator(start=(0.0, 5.0, 0.0),
+                        water=[(15.0, -200.0, 22.0, 200.0)],
+                        obstacles=[(5.0, -14.0, 8.0, -8.0, 1.5)])
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GPO auto-reconnect & coordinate navigation")
+    parser.add_argument("--simulate", action="store_true",
+                        help="run calibration + navigation against the offline simulator and exit")
+    parser.add_argument("--target", nargs=3, type=float, default=[40.0, 5.0, -30.0], metavar=("X", "Y", "Z"),
+                        help="simulator target coordinates")
+    parser.add_argument("--scenario", action="store_true",
+                        help="run disconnect -> join -> navigate against the simulator on a virtual clock and exit")
+    parser.add_argument("--no-ocr", action="store_true",
+                        help="simulator reads positions directly instead of OCR-ing the rendered HUD")
+    parser.add_argument("--autotune", action="store_true",
+                        help="search navigation/detection settings and write the best set to the config")
+    parser.add_argument("--corpus", metavar="DIR",
+                        help="frame corpus for --autotune detection (DIR/positive, DIR/negative)")
+    parser.add_argument("--ocr", action="store_true",
+                        help="--autotune through the real OCR path (slower) instead of direct reads")
+    args = parser.parse_args()
+
+    if args.autotune:
+        run_autotune(corpus=args.corpus, use_ocr=args.ocr)
+        sys.exit(0)
+
+    if args.simulate:
+        result = run_simulation(demo_world(), tuple(args.target), use_ocr=not args.no_ocr, log=print)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result["reached"] else 1)
+
+    if args.scenario:
+        result = run_scenario(demo_world(), tuple(args.target), use_ocr=not args.no_ocr, log=print)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result.get("navigation", {}).get("reached") else 1)
+
     app = SCGMreconnect()
     app.mainloop()
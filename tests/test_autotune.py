@@ -0,0 +1,22 @@
+import random
+
+import SCGMreconnect as scgm
+
+BASE = {"nav_mapping": {"w": "z-", "d": "x+", "space": "y+"}, "nav_move_mode": "walk",
+        "nav_velocity": {"walk": {k: {"speed": 16.0, "latency": 0.05} for k in "wasd"}},
+        "nav_arrive_threshold": 0.4}
+
+
+def test_evaluation_is_reproducible_and_leaves_global_random_alone():
+    scenarios = scgm.tuning_scenarios(2)
+    state = random.getstate()
+    first = scgm.evaluate_nav_params({}, scenarios, BASE)
+    assert random.getstate() == state
+    random.seed(99)
+    assert scgm.evaluate_nav_params({}, scenarios, BASE) == first
+
+
+def test_autotune_keeps_the_users_arrival_threshold():
+    result = scgm.autotune_navigation(BASE, scgm.tuning_scenarios(1), passes=1, log=lambda m: None)
+    assert "nav_arrive_threshold" not in result["params"]
+    assert "nav_arrive_threshold" not in scgm.NAV_TUNING_SPACE
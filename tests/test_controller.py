@@ -0,0 +1,73 @@
+import SCGMreconnect as scgm
+
+POSITIONS = {name: {"x": 10 * i, "y": 10 * i} for i, name in enumerate(
+    ["1. Server Menu Button", "2. TextBox Input Area", "3. Fish Hub Button", "4. Running Man Button"], 1)}
+
+
+def make_controller(config, **kwargs):
+    backend = scgm.RecordingInputBackend()
+    ctl = scgm.RecoveryController(config, backend, scgm.FrameBus(capture=lambda: None, clock=backend.clock),
+                                  lambda: (0.0, 5.0, 0.0), positions=lambda: POSITIONS,
+                                  join_steps=scgm.DEFAULT_JOIN_SEQUENCE, clock=backend.clock,
+                                  log=lambda m: None, **kwargs)
+    return ctl, backend
+
+
+def typed(backend):
+    return "".join(e[1] for _, e in backend.events if e[0] == "write")
+
+
+def test_join_uses_compiled_settings_snapshot():
+    config = {"server_code": "OLD1", "wait_after_reconnect": 7}
+    ctl, backend = make_controller(config)
+    config["server_code"] = "NEW2"
+    assert ctl.run_join_sequence()
+    assert typed(backend) == "OLD1"
+
+    backend.clear()
+    ctl.compile()
+    assert ctl.run_join_sequence()
+    assert typed(backend) == "NEW2"
+    assert ctl.settings.wait_after_reconnect == 7.0
+
+
+def test_calibration_persists_through_the_given_writer():
+    writes = []
+    sim = scgm.demo_world()
+    clock = scgm.sim_clock(sim)
+    config = {"ocr_region": list(sim.hud_region)}
+    ctl = scgm.RecoveryController(config, scgm.SimInputBackend(sim, clock=clock),
+                                  scgm.FrameBus(capture=sim.render, clock=clock), sim.read_direct,
+                                  clock=clock, log=lambda m: None, save_config=lambda: writes.append(dict(config)))
+    ctl.start_navigation()
+    assert ctl.nav_tick() == "calibrated"
+    assert writes and writes[-1]["nav_mapping"]["w"] == "z-"
+
+
+def test_join_from_another_thread_blocks_ticks_and_second_joins():
+    import threading
+    reading, release = threading.Event(), threading.Event()
+
+    def read_coords():
+        reading.set()
+        release.wait(5)
+        return (0.0, 5.0, 0.0)
+
+    backend = scgm.RecordingInputBackend()
+    ctl = scgm.RecoveryController({}, backend, scgm.FrameBus(capture=lambda: None, clock=backend.clock),
+                                  read_coords, positions=lambda: POSITIONS, join_steps=scgm.DEFAULT_JOIN_SEQUENCE,
+                                  calibrate=False, clock=backend.clock, log=lambda m: None)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(ctl.run_join_sequence()))
+    worker.start()
+    assert reading.wait(5)  # first join is waiting for coordinates
+    assert ctl.joining()
+    assert not ctl.run_join_sequence()
+    ctl.nav_active = True
+    sent = len(backend.events)
+    ctl.tick()
+    assert len(backend.events) == sent  # no navigation keys in the middle of the join
+    ctl.nav_active = False
+    release.set()
+    worker.join(5)
+    assert results == [True] and ctl.nav_active and not ctl.joining()
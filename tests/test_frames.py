@@ -0,0 +1,30 @@
+import numpy as np
+
+import SCGMreconnect as scgm
+
+
+def counting_capture():
+    frames = []
+    def capture():
+        frames.append(np.full((100, 200, 3), len(frames), dtype=np.uint8))
+        return frames[-1]
+    return capture
+
+
+def test_view_clamps_the_region_to_the_frame():
+    bus = scgm.FrameBus(capture=counting_capture(), clock=scgm.VirtualClock())
+    assert bus.view((-10, -10, 50, 50)).shape == (40, 40, 3)
+    assert bus.view((190, 90, 50, 50)).shape == (10, 10, 3)
+    assert bus.view((-80, 0, 50, 50)).shape == (50, 0, 3)
+
+
+def test_snapshot_never_overwrites_the_shared_buffer():
+    clock = scgm.VirtualClock()
+    bus = scgm.FrameBus(capture=counting_capture(), clock=clock)
+    view = bus.view((0, 0, 10, 10))
+    assert bus.snapshot(max_age=1.0)[0, 0, 0] == 0  # fresh enough: a copy of the shared frame
+    clock.sleep(2.0)
+    snap = bus.snapshot((0, 0, 10, 10), max_age=1.0)
+    assert snap[0, 0, 0] == 1 and view[0, 0, 0] == 0 and bus.captures == 1
+    snap[:] = 255
+    assert view[0, 0, 0] == 0
@@ -0,0 +1,92 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import SCGMreconnect as scgm
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.down = set()
+
+    def is_pressed(self, key):
+        return key in self.down
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    kb = FakeKeyboard()
+    monkeypatch.setattr(scgm, "keyboard", kb)
+    return kb
+
+
+def press(listener, name):
+    listener._on_event(SimpleNamespace(event_type="down", name=name))
+
+
+def collector():
+    calls, done = [], threading.Semaphore(0)
+
+    def make(tag, gate=None):
+        def cb():
+            if gate: gate.wait(5)
+            calls.append(tag)
+            done.release()
+        return cb
+    return calls, done, make
+
+
+def test_repeated_press_is_debounced(keys):
+    clock = scgm.VirtualClock()
+    listener = scgm.HotkeyListener(log=lambda m: None, debounce=0.3, clock=clock)
+    calls, done, make = collector()
+    listener.register("toggle", "f6", make("toggle"))
+    press(listener, "f6")
+    press(listener, "f6")
+    clock.sleep(0.5)
+    press(listener, "f6")
+    assert done.acquire(timeout=5) and done.acquire(timeout=5)
+    assert not done.acquire(timeout=0.1)
+    assert calls == ["toggle", "toggle"]
+
+
+def test_coalesced_action_drops_presses_while_running(keys):
+    listener = scgm.HotkeyListener(log=lambda m: None)
+    gate = threading.Event()
+    calls, done, make = collector()
+    listener.register("join", "f8", make("join", gate), queue_name="join", coalesce=True)
+    listener.trigger("join")
+    listener.trigger("join")
+    gate.set()
+    assert done.acquire(timeout=5)
+    assert not done.acquire(timeout=0.1)
+    listener.trigger("join")
+    assert done.acquire(timeout=5)
+    assert calls == ["join", "join"]
+
+
+def test_modifier_combo_matches_only_its_binding(keys):
+    listener = scgm.HotkeyListener(log=lambda m: None)
+    calls, done, make = collector()
+    listener.register("plain", "f9", make("plain"))
+    listener.register("combo", "ctrl+f9", make("combo"))
+    keys.down.add("ctrl")
+    press(listener, "f9")
+    assert done.acquire(timeout=5)
+    keys.down.clear()
+    press(listener, "f9")
+    assert done.acquire(timeout=5)
+    assert calls == ["combo", "plain"]
+
+
+def test_one_shot_fires_once_and_beats_the_binding(keys):
+    listener = scgm.HotkeyListener(log=lambda m: None, debounce=0.0)
+    calls, done, make = collector()
+    listener.register("bound", "s", make("bound"))
+    listener.once("s", make("capture"))
+    press(listener, "s")
+    assert done.acquire(timeout=5)
+    press(listener, "s")
+    assert done.acquire(timeout=5)
+    assert calls == ["capture", "bound"]
@@ -0,0 +1,94 @@
+import pytest
+
+import SCGMreconnect as scgm
+
+
+def test_timed_batch_ignores_event_delay():
+    backend = scgm.RecordingInputBackend(event_delay=0.05)
+    nav = scgm.Navigator({}, backend, lambda: (None, None, None), log=lambda m: None, clock=backend.clock)
+    nav.hold_keys({"w": 0.3, "d": 0.1})
+    assert backend.events == [(0.0, ("key_down", "w")), (0.0, ("key_down", "d")),
+                              (0.1, ("key_up", "d")), (0.3, ("key_up", "w"))]
+
+
+def test_untimed_batch_is_spaced_by_event_delay():
+    backend = scgm.RecordingInputBackend(event_delay=0.05)
+    backend.send([("key_down", "ctrl"), ("press", "a"), ("key_up", "ctrl")])
+    assert [t for t, _ in backend.events] == [0.0, 0.05, 0.1]
+    assert abs(backend.virtual_time - 0.15) < 1e-9
+
+
+def test_default_join_sequence_event_stream():
+    backend = scgm.RecordingInputBackend(event_delay=0.05)
+    positions = {name: {"x": 10 * i, "y": 10 * i + 5} for i, name in enumerate(
+        ["1. Server Menu Button", "2. TextBox Input Area", "3. Fish Hub Button", "4. Running Man Button"], 1)}
+    config = {}
+    seq = scgm.JoinSequence(scgm.DEFAULT_JOIN_SEQUENCE, backend, positions=positions,
+                            variables={"server_code": "AB1"}, conditions={"coords_visible": lambda: True},
+                            config=config, log=lambda m: None, clock=backend.clock)
+    ok, results = seq.run()
+    assert ok and all(r["ok"] for r in results)
+    assert config == {"nav_move_mode": "run"}
+
+    def click(t, x, y):
+        return [(t, ("move_to", x, y)), (t + 1.0, ("move_rel", 2, 2)), (t + 1.0, ("move_rel", -2, -2)),
+                (t + 1.0, ("click",)), (t + 1.3, ("click",)), (t + 1.6, ("click",))]
+
+    expected = (click(0.0, 10, 15) + click(9.9, 20, 25) + [
+        (19.8, ("click",)),
+        (19.8, ("key_down", "ctrl")), (19.85, ("press", "a")), (19.9, ("key_up", "ctrl")),
+        (19.95, ("press", "backspace")),
+        (20.5, ("write", "A")), (20.6, ("write", "B")), (20.7, ("write", "1")),
+        (21.8, ("press", "enter")),
+    ] + click(29.85, 30, 35) + click(31.75, 40, 45) + [
+        (35.65, ("key_down", "shift")), (36.7, ("press", "f3")),
+        (44.75, ("press", "1")), (46.75, ("press", "1")), (48.75, ("press", "1")), (50.75, ("press", "1")),
+        (52.75, ("key_up", "shift")),
+    ])
+    assert [e for _, e in backend.events] == [e for _, e in expected]
+    assert all(abs(t - te) < 1e-6 for (t, _), (te, _) in zip(backend.events, expected))
+
+
+class FakeDirectInput:
+    """Only the primitives that honour _pause; press()/moveRel() would pause internally."""
+    def __init__(self):
+        self.calls = []
+        self.pos = (100, 200)
+
+    def position(self):
+        return self.pos
+
+    def __getattr__(self, name):
+        if name not in ("keyDown", "keyUp", "moveTo", "click", "mouseDown", "mouseUp"):
+            raise AttributeError(name)
+        def call(*args, _pause=True):
+            assert _pause is False
+            self.calls.append((name,) + args)
+        return call
+
+
+def test_direct_backend_never_uses_the_global_pause(monkeypatch):
+    fake = FakeDirectInput()
+    monkeypatch.setattr(scgm, "pydirectinput", fake)
+    backend = scgm.DirectInputBackend()
+    backend.send([("press", "f3"), ("move_rel", 0, 1), ("click",)])
+    assert fake.calls == [("keyDown", "f3"), ("keyUp", "f3"), ("moveTo", 100, 201), ("click",)]
+
+
+def test_join_sequence_rejects_timeouts_on_input_steps(tmp_path):
+    path = tmp_path / "join_sequence.json"
+    path.write_text('[{"type": "type", "text": "{server_code}", "timeout": 2, "retries": 1}]')
+    with pytest.raises(ValueError, match="timeout"):
+        scgm.load_join_sequence(str(path))
+    path.write_text('[{"type": "wait_until", "condition": "coords_visible", "timeout": 2}]')
+    assert scgm.load_join_sequence(str(path))[0]["timeout"] == 2
+
+
+def test_slow_input_step_is_not_replayed():
+    backend = scgm.RecordingInputBackend()
+    steps = [{"name": "code", "type": "type", "text": "{server_code}", "interval": 1.0, "retries": 2}]
+    seq = scgm.JoinSequence(steps, backend, variables={"server_code": "AB1"}, log=lambda m: None,
+                            clock=backend.clock)
+    ok, results = seq.run()
+    assert ok and results[0]["attempts"] == 1
+    assert "".join(e[1] for _, e in backend.events if e[0] == "write") == "AB1"
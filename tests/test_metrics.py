@@ -0,0 +1,69 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import SCGMreconnect as scgm
+
+
+@pytest.fixture
+def server():
+    state = {"navigation": False}
+    controls = {"navigation": (lambda: state["navigation"], lambda v: state.__setitem__("navigation", v))}
+    metrics = scgm.Metrics()
+    metrics.inc("reconnects_total")
+    metrics.observe("ocr_seconds", 0.25)
+    metrics.observe("ocr_seconds", 0.75)
+    srv = scgm.MetricsServer(metrics, controls, host="127.0.0.1", port=0).start()
+    srv.state = state
+    yield srv
+    srv.stop()
+
+
+def request(srv, path, body=None, method="GET"):
+    req = urllib.request.Request(f"http://127.0.0.1:{srv.port}{path}", data=body, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return r.status, r.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def test_metrics_render_and_query_string(server):
+    status, text = request(server, "/metrics?x=1")
+    assert status == 200
+    assert "gpo_reconnects_total 1" in text
+    lines = text.splitlines()
+    summary = lines.index("# TYPE gpo_ocr_seconds summary")
+    assert lines[summary + 1:summary + 3] == ["gpo_ocr_seconds_count 2", "gpo_ocr_seconds_sum 1.0"]
+    assert "# TYPE gpo_ocr_seconds_max gauge" in lines and "gpo_ocr_seconds_max 0.75" in lines
+    assert request(server, "/status?pretty")[1] == json.dumps({"navigation": False})
+
+
+def test_control_accepts_bools_and_empty_toggle(server):
+    assert request(server, "/control/navigation", b'{"enabled": true}', "POST") == (200, '{"navigation": true}')
+    assert server.state["navigation"] is True
+    assert request(server, "/control/navigation", b"", "POST") == (200, '{"navigation": false}')
+    assert request(server, "/control/navigation?src=ci", b"", "POST")[0] == 200
+    assert server.state["navigation"] is True
+
+
+@pytest.mark.parametrize("body", [b'{"enabled": "false"}', b"[1]", b"{}", b'{"enabled": 1}', b"nope"])
+def test_control_rejects_bad_bodies(server, body):
+    status, _ = request(server, "/control/navigation", body, "POST")
+    assert status == 400
+    assert server.state["navigation"] is False
+
+
+def test_unknown_paths(server):
+    assert request(server, "/nope")[0] == 404
+    assert request(server, "/control/nope", b"", "POST")[0] == 404
+
+
+def test_label_values_are_escaped():
+    metrics = scgm.Metrics()
+    metrics.set(scgm.Metrics.series("join_step_seconds", step='say "hi"\\\nnow'), 1.5)
+    lines = metrics.render().splitlines()
+    assert lines == ["# TYPE gpo_join_step_seconds gauge",
+                     'gpo_join_step_seconds{step="say \\"hi\\"\\\\\\nnow"} 1.5']
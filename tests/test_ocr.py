@@ -0,0 +1,104 @@
+import numpy as np
+from PIL import Image
+
+import SCGMreconnect as scgm
+
+
+def chars(text, conf=0.9):
+    return [(c, conf) for c in text]
+
+
+def fake_readings(text, calls):
+    def ocr_readings(img, debug_path=None, factor=4, resample="LANCZOS", variants=scgm.OCR_ENSEMBLE):
+        calls.append((factor, resample))
+        return [chars(text) for _ in variants]
+    return ocr_readings
+
+
+def test_reader_decodes_through_ensemble_readings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scgm, "ocr_readings", fake_readings("X: 12.5 Y: 5.0 Z: -3.2", calls))
+    reader = scgm.CoordReader({"ocr_scale": {"region": [0, 0, 10, 10], "factor": 2, "filter": "BICUBIC"},
+                               "ocr_region": [0, 0, 10, 10]}, clock=scgm.VirtualClock())
+    coords, _ = reader.read(Image.new("RGB", (10, 10)))
+    assert coords == (12.5, 5.0, -3.2)
+    assert calls == [(2, "BICUBIC")]
+
+
+def test_select_ocr_scale_reads_like_navigation(monkeypatch):
+    calls = []
+    def ocr_readings(img, debug_path=None, factor=4, resample="LANCZOS", variants=scgm.OCR_ENSEMBLE):
+        calls.append((factor, resample))
+        x = int(np.asarray(img)[0, 0, 0])
+        return [chars(f"X: {x}.5 Y: 5.0 Z: -3.2" if factor > 1 else "X: 0.0") for _ in variants]
+    monkeypatch.setattr(scgm, "ocr_readings", ocr_readings)
+    crops = [np.full((10, 10, 3), i, dtype=np.uint8) for i in (1, 2, 3)]
+    labels = [(i + 0.5, 5.0, -3.2) for i in (1, 2, 3)]
+    best, table = scgm.select_ocr_scale(crops, labels, reader=scgm.CoordReader({}))
+    assert (best["factor"], best["filter"], best["accuracy"]) == (2, "NEAREST", 1.0)
+    assert [(r["factor"], r["filter"]) for r in table] == [(1, "NEAREST"), (2, "NEAREST")]
+
+
+def test_select_ocr_scale_needs_distinct_labels():
+    crops = [np.zeros((10, 10, 3), dtype=np.uint8)] * 8
+    assert scgm.select_ocr_scale(crops, [(12.5, 5.0, -3.2)] * 8) == (None, [])
+
+
+def test_reader_without_decoder_uses_consensus(monkeypatch):
+    seen = {}
+    def ensemble(img, debug_path=None, factor=4, resample="LANCZOS", variants=scgm.OCR_ENSEMBLE, min_agree=2):
+        seen["min_agree"] = min_agree
+        return (1.0, 2.0, 3.0), ""
+    monkeypatch.setattr(scgm, "ocr_coords_ensemble", ensemble)
+    reader = scgm.CoordReader({"ocr_decoder": False, "ocr_consensus": 3})
+    assert reader.read(Image.new("RGB", (10, 10)))[0] == (1.0, 2.0, 3.0)
+    assert seen["min_agree"] == 3
+
+
+def test_decoder_requires_consensus_support():
+    readings = [chars("X: 12.5 Y: 5.0 Z: -3.2"), chars("X: 99.9 Y: 5.0 Z: -3.2", 0.2), chars("X: 98.1 Y: 5.0 Z: -3.2", 0.2)]
+    coords, details = scgm.CoordDecoder().decode(readings, 0.0, min_support=2)
+    assert coords is None and details["support"] == 1
+    coords, _ = scgm.CoordDecoder().decode(readings, 0.0, min_support=1)
+    assert coords == (12.5, 5.0, -3.2)
+
+
+def test_decoder_errors_back_off_then_retry(monkeypatch):
+    attempts = []
+    def broken(img, **kwargs):
+        attempts.append(1)
+        raise ValueError("bad box")
+    monkeypatch.setattr(scgm, "ocr_readings", broken)
+    monkeypatch.setattr(scgm, "ocr_coords_ensemble", lambda img, **kwargs: ((1.0, 2.0, 3.0), ""))
+    clock = scgm.VirtualClock()
+    reader = scgm.CoordReader({}, clock=clock, log=lambda m: None)
+    assert reader.read(Image.new("RGB", (10, 10)))[0] == (1.0, 2.0, 3.0)
+    reader.read(Image.new("RGB", (10, 10)))
+    assert len(attempts) == 1
+    clock.sleep(reader.DECODER_RETRY_SECONDS)
+    reader.read(Image.new("RGB", (10, 10)))
+    assert len(attempts) == 2 and not reader.decoder_failed
+
+
+def test_missing_hocr_disables_decoder(monkeypatch):
+    def no_hocr(img, **kwargs):
+        raise scgm.pytesseract.TesseractError(1, "read_params_file: Can't open hocr")
+    monkeypatch.setattr(scgm, "ocr_readings", no_hocr)
+    monkeypatch.setattr(scgm, "ocr_coords_ensemble", lambda img, **kwargs: (None, ""))
+    reader = scgm.CoordReader({}, clock=scgm.VirtualClock(), log=lambda m: None)
+    reader.read(Image.new("RGB", (10, 10)))
+    assert reader.decoder_failed
+
+
+def test_reader_uses_its_compiled_snapshot(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scgm, "ocr_readings", fake_readings("X: 12.5 Y: 5.0 Z: -3.2", calls))
+    config = {"ocr_region": [0, 0, 10, 10]}
+    reader = scgm.CoordReader(config, clock=scgm.VirtualClock())
+    config["ocr_scale"] = {"region": [0, 0, 10, 10], "factor": 2, "filter": "BICUBIC"}
+    reader.read(Image.new("RGB", (10, 10)))
+    reader.compile()
+    reader.read(Image.new("RGB", (10, 10)))
+    assert calls == [(4, "LANCZOS"), (2, "BICUBIC")]
+    config["ocr_region"] = [5, 5, 10, 10]
+    assert not reader.scale_stale() and reader.compile().scale_stale and reader.scale() == (4, "LANCZOS")
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+import SCGMreconnect as scgm
+
+
+def test_prune_keeps_newest_archives(tmp_path):
+    for i in range(5):
+        (tmp_path / f"incident_20260101_00000{i}_disconnect.npz").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("keep")
+    scgm.FlightRecorder(seconds=1, max_incidents=2).prune(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["incident_20260101_000003_disconnect.npz",
+                                            "incident_20260101_000004_disconnect.npz", "notes.txt"]
+
+
+def test_one_dump_per_disconnect():
+    sim = scgm.demo_world()
+    clock = scgm.sim_clock(sim)
+    bus = scgm.FrameBus(capture=sim.render, clock=clock)
+    sim.disconnect()
+    x, y, w, h = sim.buttons["reconnect"]
+    template = bus.grab()[y:y + h, x:x + w].copy()
+    recorder = scgm.FlightRecorder(seconds=5, max_mb=1, clock=clock)
+    dumps = []
+    recorder.dump = lambda reason, **kwargs: dumps.append(reason)
+    # Recording backend: clicks never reach the simulator, so the button stays up
+    ctl = scgm.RecoveryController({"reconnect_interval": 1}, scgm.RecordingInputBackend(clock=clock), bus,
+                                  sim.read_direct, template=template, clock=clock, log=lambda m: None,
+                                  recorder=recorder)
+    assert ctl.scan_reconnect() and ctl.scan_reconnect() and ctl.scan_reconnect()
+    assert dumps == ["disconnect"]
+    assert ctl.metrics.counters["reconnects_total"] == 1
+
+    sim.state = "world"
+    clock.sleep(1)
+    assert not ctl.scan_reconnect()
+    sim.disconnect()
+    clock.sleep(1)
+    assert ctl.scan_reconnect()
+    assert dumps == ["disconnect", "disconnect"]
+    assert np.isfinite(recorder.t).sum() == 5
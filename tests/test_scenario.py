@@ -0,0 +1,31 @@
+import random
+import time
+
+import SCGMreconnect as scgm
+
+
+def test_scenario_recovers_and_navigates():
+    result = scgm.run_scenario(scgm.demo_world(), (40.0, 5.0, -30.0), use_ocr=False, rng=random.Random(3))
+    assert result["reconnected"] and result["joined"]
+    assert all(step["ok"] for step in result["join_steps"])
+    assert result["navigation"]["reached"]
+    assert result["navigation"]["error"] < 1.0
+    assert result["wall_seconds"] < result["sim_seconds"] / 10
+
+
+def test_scenario_reports_failed_join():
+    sim = scgm.demo_world()
+    sim.positions = lambda: {}  # setup never captured the button positions
+    result = scgm.run_scenario(sim, (40.0, 5.0, -30.0), use_ocr=False, max_seconds=300)
+    assert result["reconnected"]
+    assert not result["joined"]
+    assert "navigation" not in result
+
+
+def test_run_started_comes_from_the_clock():
+    clock = scgm.VirtualClock(start=5.0, epoch=1_000_000.0)
+    nav = scgm.Navigator({}, scgm.RecordingInputBackend(clock=clock), lambda: (0.0, 0.0, 0.0),
+                         log=lambda m: None, clock=clock)
+    nav.start_run((0.0, 0.0, 0.0))
+    summary = nav.finish_run(reached=False)
+    assert summary["started"] == time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(1_000_005.0))
@@ -0,0 +1,39 @@
+import SCGMreconnect as scgm
+
+
+def test_simulation_calibrates_and_reaches_target():
+    result = scgm.run_simulation(scgm.demo_world(), (40.0, 5.0, -30.0), use_ocr=False)
+    assert result["calibrated"] and result["reached"]
+    assert result["error"] < 1.0
+    assert result["mapping"] == {"space": "y+", "w": "z-", "d": "x+"}
+    assert abs(result["velocity"]["w"]["speed"] - 16.0) < 1.5
+    assert result["run"]["reached"]
+
+
+def test_simulation_survives_misreads_and_rotated_mapping():
+    sim = scgm.GPOSimulator(mapping={"w": "x+", "d": "z+"}, misread_rate=0.1, seed=4)
+    result = scgm.run_simulation(sim, (-20.0, 5.0, 25.0), use_ocr=False)
+    assert result["reached"]
+    assert result["mapping"]["w"] == "x+" and result["mapping"]["d"] == "z+"
+
+
+def test_simulation_without_calibration_uses_configured_model():
+    config = {"nav_velocity": {"walk": {k: {"speed": 16.0, "latency": 0.05} for k in "wasd"}}}
+    result = scgm.run_simulation(scgm.demo_world(), (40.0, 5.0, -30.0), config=config, calibrate=False,
+                                 use_ocr=False)
+    assert result["reached"] and result["calibration_sim_seconds"] == 0.0
+
+
+def test_calibration_against_a_wall_takes_the_unobstructed_speed():
+    sim = scgm.GPOSimulator(obstacles=[(2.0, -50.0, 4.0, 50.0, 3.0)])  # right where D walks
+    result = scgm.run_simulation(sim, (-20.0, 5.0, -20.0), use_ocr=False)
+    assert result["calibrated"] and result["reached"]
+    assert all(abs(m["speed"] - 16.0) < 1.5 for m in result["velocity"].values())
+
+
+def test_navigation_corrects_a_wrong_speed_model():
+    config = {"nav_velocity": {"walk": {k: {"speed": 8.0, "latency": 0.05} for k in "wasd"}}}
+    result = scgm.run_simulation(scgm.GPOSimulator(), (-60.0, 5.0, 60.0), config=config, calibrate=False,
+                                 use_ocr=False)
+    assert result["reached"]
+    assert all(m["speed"] > 12.0 for m in result["velocity"].values())
@@ -0,0 +1,37 @@
+import numpy as np
+
+import SCGMreconnect as scgm
+
+
+def test_store_grows_and_keeps_samples(tmp_path):
+    path = str(tmp_path / "trajectory.bin")
+    store = scgm.TrajectoryStore(path, initial_capacity=4)
+    for i in range(10):
+        store.append(float(i), float(i), 0.0, 0.0, state="stuck" if i == 7 else "move", run=1)
+    assert len(store.records) >= 10
+    assert int(store._header[1]) == 10
+    assert [int(i) for i in store.near(7.0, 0.0, 0.5)] == [7]
+    assert len(store.stuck_near(7.0, 0.0)) == 1
+    store.flush()
+
+    reopened = scgm.TrajectoryStore(path)
+    assert reopened.count == 10
+    assert np.allclose(reopened.records["x"][:10], np.arange(10))
+
+
+def test_store_errors_do_not_stop_navigation():
+    class BrokenStore:
+        def next_run(self): return 1
+        def append(self, *args, **kwargs): raise OSError("disk full")
+        def flush(self): raise OSError("disk full")
+
+    logs = []
+    backend = scgm.RecordingInputBackend()
+    nav = scgm.Navigator({}, backend, lambda: (0.0, 0.0, 0.0), log=logs.append,
+                         trajectory=BrokenStore(), clock=backend.clock)
+    nav.start_run((0.0, 0.0, 0.0))
+    status, _ = nav.step()
+    nav.step()
+    assert status == "reached"
+    assert nav.finish_run(reached=True) is not None
+    assert sum("disk full" in m for m in logs) == 1